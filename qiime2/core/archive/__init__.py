@@ -8,8 +8,9 @@
 
 from .provenance import (ImportProvenanceCapture, ActionProvenanceCapture,
                          PipelineProvenanceCapture)
-from .archiver import Archiver
+from .archiver import Archiver, ArchiverReference, CompressionPolicy
 
 
-__all__ = ['Archiver', 'ImportProvenanceCapture', 'ActionProvenanceCapture',
+__all__ = ['Archiver', 'ArchiverReference', 'CompressionPolicy',
+           'ImportProvenanceCapture', 'ActionProvenanceCapture',
            'PipelineProvenanceCapture']
@@ -7,17 +7,28 @@
 # ----------------------------------------------------------------------------
 
 import collections
+import concurrent.futures
+import contextlib
 import uuid as _uuid
 import pathlib
+import shutil
+import tempfile
 import zipfile
+import zlib
 import importlib
 import os
 import io
+import json
+import random
+import sys
+import threading
 
 import qiime2
 import qiime2.core.cite as cite
+from qiime2.core.archive.provenance import Provenance
 
-from qiime2.core.util import md5sum_directory, from_checksum_format
+from qiime2.core.util import (ChecksumLedger, find_files, md5sum,
+                              from_checksum_format)
 
 _VERSION_TEMPLATE = """\
 QIIME 2
@@ -29,10 +40,73 @@ ArchiveRecord = collections.namedtuple(
     'ArchiveRecord', ['root', 'version_fp', 'uuid', 'version',
                       'framework_version'])
 
+# A picklable stand-in for an `Archiver`, see `Archiver.get_reference`.
+ArchiverReference = collections.namedtuple(
+    'ArchiverReference', ['path', 'uuid'])
+
 ChecksumDiff = collections.namedtuple(
     'ChecksumDiff', ['added', 'removed', 'changed'])
 
 
+class CompressionPolicy:
+    """Decides how each member of a saved archive is compressed.
+
+    Parameters
+    ----------
+    level : int or None, optional
+        Deflate level (0-9, or -1 for zlib's default) used for members no
+        other rule applies to. None stores members uncompressed.
+    extensions : dict, optional
+        Maps filename suffixes (e.g. ``'.fastq.gz'``) to the deflate level, or
+        None, used for members ending with them. The longest matching suffix
+        wins and matching ignores case.
+    store_compressed : bool, optional
+        Store members ending with one of `COMPRESSED_EXTENSIONS`, which are
+        not going to get any smaller, unless `extensions` says otherwise.
+    store_below : int, optional
+        Store members smaller than this many bytes.
+
+    """
+    COMPRESSED_EXTENSIONS = ('.gz', '.bz2', '.xz', '.zip', '.qza', '.qzv',
+                             '.png', '.jpg', '.jpeg', '.gif', '.biom', '.h5',
+                             '.hdf5')
+
+    def __init__(self, level=zlib.Z_DEFAULT_COMPRESSION, extensions=None,
+                 store_compressed=False, store_below=0):
+        extensions = dict(extensions or {})
+        if store_compressed:
+            for ext in self.COMPRESSED_EXTENSIONS:
+                extensions.setdefault(ext, None)
+
+        for value in [level, *extensions.values()]:
+            if value is not None and value not in range(-1, 10):
+                raise ValueError("Invalid compression level: %r. Must be "
+                                 "None or an integer from -1 to 9." % value)
+
+        self.level = level
+        self.extensions = extensions
+        self.store_below = store_below
+
+        self._suffixes = sorted(((ext.lower(), lvl)
+                                 for ext, lvl in extensions.items()),
+                                key=lambda x: len(x[0]), reverse=True)
+
+    def __repr__(self):
+        return ('%s(level=%r, extensions=%r, store_below=%r)'
+                % (type(self).__name__, self.level, self.extensions,
+                   self.store_below))
+
+    def get_level(self, name, size):
+        """Return the deflate level for a member, or None to store it."""
+        if size < self.store_below:
+            return None
+        name = name.lower()
+        for ext, level in self._suffixes:
+            if name.endswith(ext):
+                return level
+        return self.level
+
+
 class _Archive:
     """Abstraction layer over the archive filesystem.
 
@@ -97,7 +171,7 @@ class _Archive:
                              framework_version)
 
     @classmethod
-    def save(cls, source, destination):
+    def save(cls, source, destination, workers=1, compression=None):
         raise NotImplementedError
 
     def __init__(self, path):
@@ -129,10 +203,14 @@ class _Archive:
         return uuid
 
     def _get_versions(self):
+        with self.open(self.VERSION_FILE) as fh:
+            return self._parse_versions(fh.read())
+
+    @classmethod
+    def _parse_versions(cls, text):
         try:
-            with self.open(self.VERSION_FILE) as fh:
-                header, version_line, framework_version_line, eof = \
-                    fh.read().split('\n')
+            header, version_line, framework_version_line, eof = \
+                text.split('\n')
             if header.strip() != 'QIIME 2':
                 raise Exception()  # GOTO except Exception
             version = version_line.split(':')[1].strip()
@@ -149,7 +227,7 @@ class _Archive:
     def open(self, relpath):
         raise NotImplementedError
 
-    def mount(self, filepath):
+    def mount(self, filepath, lazy=False):
         raise NotImplementedError
 
 
@@ -160,29 +238,210 @@ class _ZipArchive(_Archive):
     def is_archive_type(cls, path):
         return zipfile.is_zipfile(str(path))
 
+    def __init__(self, path, zf=None):
+        # An open `ZipFile` of `path` to read from instead of reopening it
+        # (and parsing its central directory) for every operation.
+        self._zf = zf
+        super().__init__(path)
+        self._signature = self._get_signature()
+
+    @classmethod
+    @contextlib.contextmanager
+    def reading(cls, path):
+        """Read the archive at `path` through a single open `ZipFile`.
+
+        The archive yielded opens `path` again for each operation once the
+        block exits.
+
+        """
+        try:
+            zf = zipfile.ZipFile(str(path), mode='r')
+        except (zipfile.BadZipFile, OSError):
+            raise ValueError("%s is not a QIIME archive." % path)
+
+        with zf:
+            archive = cls(path, zf=zf)
+            try:
+                yield archive
+            finally:
+                archive._zf = None
+
+    @contextlib.contextmanager
+    def _zipfile(self):
+        if self._zf is not None:
+            yield self._zf
+        else:
+            with zipfile.ZipFile(str(self.path), mode='r') as zf:
+                yield zf
+
+    # Compressed members are held in memory up to this size before spilling
+    # to a temporary file during a parallel save.
+    _SPOOL_SIZE = 16 * 1024 * 1024
+    _CHUNK_SIZE = 1024 * 1024
+    # `zipfile` has no public way of writing a member which was compressed
+    # ahead of time, so `_append_member` relies on its internals. They are
+    # only known to behave on these versions of Python (from, up to but not
+    # including); elsewhere members are written one at a time instead.
+    _APPEND_VERSIONS = ((3, 6), (3, 12))
+
     @classmethod
-    def save(cls, source, destination):
+    def save(cls, source, destination, workers=1, compression=None):
+        """Write the directory `source` to the ZIP64 file `destination`.
+
+        Members are compressed according to `compression`, a
+        `CompressionPolicy` which defaults to deflating everything at zlib's
+        default level. With more than one worker, members are compressed
+        concurrently on a thread pool and then appended to the archive in the
+        same order (and with the same headers) as a serial save would write
+        them.
+
+        """
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if compression is None:
+            compression = CompressionPolicy()
+
         with zipfile.ZipFile(str(destination), mode='w',
                              compression=zipfile.ZIP_DEFLATED,
                              allowZip64=True) as zf:
-            for root, dirs, files in os.walk(str(source)):
-                # Prune hidden directories from traversal. Strategy modified
-                # from http://stackoverflow.com/a/13454267/3776794
-                dirs[:] = [d for d in dirs if not d.startswith('.')]
+            members = cls._iter_members(source)
+            if workers <= 1 or not cls._can_append(zf):
+                for abspath, arcname in members:
+                    cls._write_member(zf, abspath, arcname, compression)
+            else:
+                cls._write_parallel(zf, members, workers, compression)
+
+    @classmethod
+    def _iter_members(cls, source):
+        for root, dirs, files in os.walk(str(source)):
+            # Prune hidden directories from traversal. Strategy modified
+            # from http://stackoverflow.com/a/13454267/3776794
+            dirs[:] = [d for d in dirs if not d.startswith('.')]
+
+            for file in files:
+                if file.startswith('.'):
+                    continue
+
+                abspath = pathlib.Path(root) / file
+                relpath = abspath.relative_to(source)
+
+                yield str(abspath), cls._as_zip_path(relpath)
+
+    @classmethod
+    def _write_member(cls, zf, abspath, arcname, compression):
+        level = compression.get_level(arcname, os.path.getsize(abspath))
+        if level is None:
+            zf.write(abspath, arcname=arcname,
+                     compress_type=zipfile.ZIP_STORED)
+        elif level == zlib.Z_DEFAULT_COMPRESSION:
+            zf.write(abspath, arcname=arcname)
+        elif sys.version_info >= (3, 7):
+            zf.write(abspath, arcname=arcname, compresslevel=level)
+        elif cls._can_append(zf):
+            # ZipFile.write doesn't take a compression level before 3.7
+            cls._append_member(
+                zf, *cls._compress_member(abspath, arcname, compression))
+        else:
+            zf.write(abspath, arcname=arcname)
 
-                for file in files:
-                    if file.startswith('.'):
-                        continue
+    @classmethod
+    def _can_append(cls, zf):
+        start, stop = cls._APPEND_VERSIONS
+        return (start <= sys.version_info[:2] < stop and
+                all(hasattr(zf, name)
+                    for name in ('fp', 'start_dir', '_writecheck',
+                                 'filelist', 'NameToInfo')) and
+                hasattr(zipfile.ZipInfo, 'FileHeader'))
 
-                    abspath = pathlib.Path(root) / file
-                    relpath = abspath.relative_to(source)
+    @classmethod
+    def _write_parallel(cls, zf, members, workers, compression):
+        with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+            # Bound the number of compressed members waiting to be written.
+            pending = collections.deque()
+            try:
+                for abspath, arcname in members:
+                    pending.append(executor.submit(
+                        cls._compress_member, abspath, arcname, compression))
+                    if len(pending) >= 2 * workers:
+                        cls._append_member(zf, *pending.popleft().result())
+                while pending:
+                    cls._append_member(zf, *pending.popleft().result())
+            finally:
+                for future in pending:
+                    if not future.cancel() and future.exception() is None:
+                        future.result()[2].close()
 
-                    zf.write(str(abspath), arcname=cls._as_zip_path(relpath))
+    @classmethod
+    def _compress_member(cls, filename, arcname, compression):
+        zinfo = zipfile.ZipInfo.from_file(filename, arcname)
+        level = compression.get_level(zinfo.filename, zinfo.file_size)
+        if level is None:
+            zinfo.compress_type = zipfile.ZIP_STORED
+            compressor = None
+        else:
+            zinfo.compress_type = zipfile.ZIP_DEFLATED
+            compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+        # This mirrors `zipfile`, which decides on ZIP64 headers from the
+        # size on disk before the member is written.
+        zip64 = zinfo.file_size * 1.05 > zipfile.ZIP64_LIMIT
+
+        data = tempfile.SpooledTemporaryFile(max_size=cls._SPOOL_SIZE)
+        file_size = crc = 0
+        try:
+            with open(filename, 'rb') as fh:
+                for chunk in iter(lambda: fh.read(cls._CHUNK_SIZE), b''):
+                    file_size += len(chunk)
+                    crc = zlib.crc32(chunk, crc)
+                    if compressor is not None:
+                        chunk = compressor.compress(chunk)
+                    data.write(chunk)
+            if compressor is not None:
+                data.write(compressor.flush())
+        except Exception:
+            data.close()
+            raise
+
+        zinfo.file_size = file_size
+        zinfo.compress_size = data.tell()
+        zinfo.CRC = crc
+        data.seek(0)
+        return zinfo, zip64, data
+
+    @classmethod
+    def _append_member(cls, zf, zinfo, zip64, data):
+        with data:
+            if not zip64 and (zinfo.file_size > zipfile.ZIP64_LIMIT or
+                              zinfo.compress_size > zipfile.ZIP64_LIMIT):
+                raise RuntimeError('%s unexpectedly exceeded ZIP64 limit'
+                                   % zinfo.filename)
+
+            zf.fp.seek(zf.start_dir)
+            zinfo.header_offset = zf.fp.tell()
+            zf._writecheck(zinfo)
+            zf._didModify = True
+
+            zf.fp.write(zinfo.FileHeader(zip64))
+            shutil.copyfileobj(data, zf.fp, cls._CHUNK_SIZE)
+
+            zf.start_dir = zf.fp.tell()
+            zf.filelist.append(zinfo)
+            zf.NameToInfo[zinfo.filename] = zinfo
+
+    def iter_files(self, relpath):
+        """Yield relative paths of the files below `relpath` in the root."""
+        root = pathlib.PurePosixPath(str(self.uuid)) / relpath
+        with self._zipfile() as zf:
+            for name in zf.namelist():
+                if name.endswith('/'):
+                    continue
+                path = pathlib.PurePosixPath(name)
+                if root in path.parents:
+                    yield path.relative_to(root)
 
     def relative_iterdir(self, relpath=''):
         relpath = self._as_zip_path(relpath)
         seen = set()
-        with zipfile.ZipFile(str(self.path), mode='r') as zf:
+        with self._zipfile() as zf:
             for name in zf.namelist():
                 if name.startswith(relpath):
                     parts = pathlib.PurePosixPath(name).parts
@@ -194,28 +453,63 @@ class _ZipArchive(_Archive):
 
     def open(self, relpath):
         relpath = pathlib.Path(str(self.uuid)) / relpath
-        with zipfile.ZipFile(str(self.path), mode='r') as zf:
+        with self._zipfile() as zf:
             # The filehandle will still work even when `zf` is "closed"
             return io.TextIOWrapper(zf.open(self._as_zip_path(relpath)))
 
-    def mount(self, filepath):
+    def mount(self, filepath, lazy=False):
         # TODO: use FUSE/MacFUSE/Dokany bindings (many Python bindings are
         # outdated, we may need to take up maintenance/fork)
-        root = self.extract(filepath)
+        if lazy:
+            # Only the files at the root of the archive (VERSION,
+            # metadata.yaml, etc.) are needed to interpret the format, the
+            # rest is extracted on demand with `extract(filepath, relpath)`.
+            root = self._extract(filepath, lambda parts: len(parts) == 2)
+        else:
+            root = self.extract(filepath)
         return ArchiveRecord(root, root / self.VERSION_FILE,
                              self.uuid, self.version, self.framework_version)
 
-    def extract(self, filepath):
+    def extract(self, filepath, relpath='', exclude=()):
+        root = pathlib.PurePosixPath(str(self.uuid))
+        include = (root / relpath).parts
+        exclude = [(root / e).parts for e in exclude]
+
+        def predicate(parts):
+            return (parts[:len(include)] == include and
+                    not any(parts[:len(e)] == e for e in exclude))
+
+        return self._extract(filepath, predicate)
+
+    def _extract(self, filepath, predicate):
         filepath = pathlib.Path(filepath)
-        with zipfile.ZipFile(str(self.path), mode='r') as zf:
+        self._check_unmodified()
+        with self._zipfile() as zf:
             for name in zf.namelist():
-                if name.startswith(str(self.uuid)):
+                parts = pathlib.PurePosixPath(name).parts
+                if parts[:1] == (str(self.uuid),) and predicate(parts):
                     # extract removes `..` components, so as long as we extract
                     # into `filepath`, the path won't go backwards.
                     zf.extract(name, path=str(filepath))
 
         return filepath / str(self.uuid)
 
+    def _get_signature(self):
+        stat = self.path.stat()
+        return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    def _check_unmodified(self):
+        # A lazily mounted archive is read long after it was opened, by which
+        # point the filepath may have been deleted or replaced with a
+        # different archive. Refuse to extract from it if that happened.
+        try:
+            signature = self._get_signature()
+        except FileNotFoundError:
+            signature = None
+        if signature != self._signature:
+            raise ValueError("%s was modified or removed after it was loaded."
+                             % self.path)
+
     @classmethod
     def _as_zip_path(self, path):
         path = str(pathlib.PurePosixPath(path))
@@ -227,9 +521,51 @@ class _ZipArchive(_Archive):
         return path
 
 
+class _LazyMembers:
+    """The members of a directory in a lazily loaded archive.
+
+    Iterating yields the relative path of each file in the directory, whether
+    or not it has been mounted yet.
+
+    """
+    def __init__(self, archiver, relpath):
+        self._archiver = archiver
+        self._relpath = pathlib.PurePosixPath(relpath)
+        self._deferred = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def mounted(self):
+        return self._archiver.is_mounted(self._relpath)
+
+    def __iter__(self):
+        return self._archiver.iter_files(self._relpath)
+
+    def defer(self, relpath, callback):
+        """Call `callback` once the member at `relpath` is mounted."""
+        relpath = pathlib.PurePosixPath(pathlib.PurePath(relpath).as_posix())
+        with self._lock:
+            self._deferred.setdefault(relpath, []).append(callback)
+
+    def mount(self, relpath='.'):
+        relpath = pathlib.PurePosixPath(pathlib.PurePath(relpath).as_posix())
+        self._archiver.mount(self._relpath / relpath)
+
+        with self._lock:
+            ready = [key for key in self._deferred
+                     if str(relpath) == '.' or key == relpath or
+                     relpath in key.parents]
+            callbacks = [cb for key in ready for cb in self._deferred.pop(key)]
+        for callback in callbacks:
+            callback()
+
+
 class Archiver:
     CURRENT_FORMAT_VERSION = '5'
     CURRENT_ARCHIVE = _ZipArchive
+    # An `qiime2.core.archive.cache.ExtractionCache` to mount loaded archives
+    # from, or None to always extract them.
+    EXTRACTION_CACHE = None
     _FORMAT_REGISTRY = {
         # NOTE: add more archive formats as things change
         '0': 'qiime2.core.archive.format.v0:ArchiveFormat',
@@ -265,6 +601,18 @@ class Archiver:
 
         return archive
 
+    @classmethod
+    @contextlib.contextmanager
+    def open_archive(cls, filepath):
+        """Like `get_archive`, but the file is only opened once while the
+        archive is used within the block."""
+        filepath = pathlib.Path(filepath)
+        if not filepath.exists():
+            raise ValueError("%s does not exist." % filepath)
+
+        with _ZipArchive.reading(filepath) as archive:
+            yield archive
+
     @classmethod
     def _futuristic_archive_error(cls, filepath, archive):
         raise ValueError("%s was created by 'QIIME %s'. The currently"
@@ -275,16 +623,38 @@ class Archiver:
 
     @classmethod
     def peek(cls, filepath):
-        archive = cls.get_archive(filepath)
-        Format = cls.get_format_class(archive.version)
-        if Format is None:
-            cls._futuristic_archive_error(filepath, archive)
-        # NOTE: in the future, we may want to manipulate the results so that
-        # older formats provide the "new" API even if they don't support it.
-        # e.g. a new format has a new property that peek should describe. We
-        # add some compatability code here to return a default for that
-        # property on older formats.
-        return Format.load_metadata(archive)
+        with cls.open_archive(filepath) as archive:
+            Format = cls.get_format_class(archive.version)
+            if Format is None:
+                cls._futuristic_archive_error(filepath, archive)
+            # NOTE: in the future, we may want to manipulate the results so
+            # that older formats provide the "new" API even if they don't
+            # support it. e.g. a new format has a new property that peek
+            # should describe. We add some compatability code here to return
+            # a default for that property on older formats.
+            return Format.load_metadata(archive)
+
+    @classmethod
+    def load_provenance_index(cls, filepath):
+        """Read the provenance index of an archive without extracting it.
+
+        Returns None for archives which don't have an index (e.g. those
+        written before it was introduced, or without provenance at all).
+
+        """
+        with cls.open_archive(filepath) as archive:
+            Format = cls.get_format_class(archive.version)
+            if Format is None:
+                cls._futuristic_archive_error(filepath, archive)
+            if not hasattr(Format, 'PROVENANCE_DIR'):
+                return None
+            relpath = pathlib.Path(Format.PROVENANCE_DIR) / 'index.json'
+            try:
+                with archive.open(relpath) as fh:
+                    return json.load(
+                        fh, object_pairs_hook=collections.OrderedDict)
+            except KeyError:
+                return None
 
     @classmethod
     def extract(cls, filepath, dest):
@@ -295,31 +665,168 @@ class Archiver:
         return str(archive.extract(dest))
 
     @classmethod
-    def load(cls, filepath):
-        archive = cls.get_archive(filepath)
-        Format = cls.get_format_class(archive.version)
-        if Format is None:
-            cls._futuristic_archive_error(filepath, archive)
-
-        path = cls._make_temp_path()
-        rec = archive.mount(path)
+    def load(cls, filepath, lazy=False):
+        with cls.open_archive(filepath) as archive:
+            Format = cls.get_format_class(archive.version)
+            if Format is None:
+                cls._futuristic_archive_error(filepath, archive)
+
+            path = cls._make_temp_path()
+            root = None
+            if cls.EXTRACTION_CACHE is not None:
+                # Populating the cache requires a full extraction, which is
+                # exactly what a lazy load is trying to avoid.
+                root = cls.EXTRACTION_CACHE.mount(archive, path,
+                                                  add=not lazy)
+
+            if root is not None:
+                rec = ArchiveRecord(root, root / archive.VERSION_FILE,
+                                    archive.uuid, archive.version,
+                                    archive.framework_version)
+                lazy = False
+            else:
+                rec = archive.mount(path, lazy=lazy)
+
+        return cls(path, Format(rec), archive=archive if lazy else None)
 
+    @classmethod
+    def from_reference(cls, reference, owned=False):
+        """Recreate an archiver from the files named by `reference`.
+
+        The files are used where they are rather than copied. Unless `owned`
+        is True, they are left in place when the new archiver is destroyed,
+        so whoever made `reference` must keep its archiver alive meanwhile.
+
+        """
+        path = qiime2.core.path.ArchivePath(reference.path)
+        if not owned:
+            path._destructor.detach()
+
+        root = path / reference.uuid
+        version_fp = root / _Archive.VERSION_FILE
+        version, framework_version = _Archive._parse_versions(
+            version_fp.read_text())
+        Format = cls.get_format_class(version)
+        rec = ArchiveRecord(root, version_fp, _uuid.UUID(reference.uuid),
+                            version, framework_version)
         return cls(path, Format(rec))
 
     @classmethod
-    def from_data(cls, type, format, data_initializer, provenance_capture):
+    def from_data(cls, type, format, data_initializer, provenance_capture,
+                  ledger=None):
         path = cls._make_temp_path()
         rec = cls.CURRENT_ARCHIVE.setup(path, cls.CURRENT_FORMAT_VERSION,
                                         qiime2.__version__)
 
+        if ledger is None:
+            ledger = ChecksumLedger()
+
         Format = cls.get_format_class(cls.CURRENT_FORMAT_VERSION)
-        Format.write(rec, type, format, data_initializer, provenance_capture)
+        Format.write(rec, type, format, data_initializer, provenance_capture,
+                     ledger=ledger)
 
-        return cls(path, Format(rec))
+        return cls(path, Format(rec), ledger=ledger)
 
-    def __init__(self, path, fmt):
+    def __init__(self, path, fmt, archive=None, ledger=None):
         self.path = path
         self._fmt = fmt
+        # Checksums of files below `path` which have already been computed,
+        # used by incremental validation.
+        self._ledger = ledger if ledger is not None else ChecksumLedger()
+        # When `archive` is provided, `path` was only partially mounted and
+        # the remaining members are extracted from `archive` on first access.
+        self._archive = archive
+        self._mounted = set()
+        self._mount_lock = threading.Lock()
+        self._provenance = None
+
+    def __getstate__(self):
+        # The source archive is not guaranteed to be readable wherever this
+        # object ends up, so finish mounting before it leaves the process.
+        self.mount()
+        state = self.__dict__.copy()
+        del state['_mount_lock']
+        state['_provenance'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._mount_lock = threading.Lock()
+
+    def get_reference(self):
+        """Return a small, picklable reference to this archiver's files.
+
+        Unlike pickling the archiver itself, nothing but the location of the
+        files is sent. See `from_reference`.
+
+        """
+        # Whoever receives the reference has no access to the source archive.
+        self.mount()
+        return ArchiverReference(str(self.path), str(self.uuid))
+
+    def mount(self, relpath=''):
+        """Extract the members under `relpath` of a lazily loaded archive.
+
+        This is a no-op when the archive was loaded eagerly or the members
+        have already been extracted.
+
+        """
+        relpath = pathlib.PurePosixPath(relpath)
+        with self._mount_lock:
+            if self._is_mounted(relpath):
+                return
+            # Members below `relpath` which were mounted on their own are
+            # already in place.
+            mounted = {m for m in self._mounted if relpath in m.parents}
+            if str(relpath) == '.':
+                self._archive.extract(self.path, exclude=mounted)
+                self._archive = None
+            else:
+                self._archive.extract(self.path, relpath, exclude=mounted)
+                self._mounted -= mounted
+                self._mounted.add(relpath)
+
+    def is_mounted(self, relpath=''):
+        with self._mount_lock:
+            return self._is_mounted(pathlib.PurePosixPath(relpath))
+
+    def _is_mounted(self, relpath):
+        if self._archive is None:
+            return True
+        return any(m == relpath or m in relpath.parents for m in self._mounted)
+
+    def iter_files(self, relpath=''):
+        """Yield the relative paths of the files below `relpath`, whether or
+        not they have been mounted yet.
+
+        """
+        relpath = pathlib.PurePosixPath(relpath)
+        archive = self._archive
+        if archive is None or self.is_mounted(relpath):
+            root = self._fmt.path / relpath
+            for path in root.glob('**/*'):
+                if path.is_file():
+                    yield pathlib.PurePosixPath(
+                        path.relative_to(root).as_posix())
+        else:
+            yield from archive.iter_files(relpath)
+
+    def open(self, relpath):
+        """Open the file at `relpath` for reading.
+
+        Files of a lazily loaded archive which haven't been mounted are read
+        straight from the archive instead of being extracted.
+
+        """
+        relpath = pathlib.PurePosixPath(relpath)
+        archive = self._archive
+        if archive is None or self.is_mounted(relpath):
+            return (self._fmt.path / relpath).open()
+        archive._check_unmodified()
+        try:
+            return archive.open(relpath)
+        except KeyError:
+            raise FileNotFoundError("%s is not in the archive." % relpath)
 
     @property
     def uuid(self):
@@ -335,39 +842,135 @@ class Archiver:
 
     @property
     def data_dir(self):
+        self.mount(self._fmt.DATA_DIR)
         return self._fmt.data_dir
 
+    @property
+    def lazy_data_dir(self):
+        """The data directory, mounting members as directory formats need them.
+
+        For an eagerly loaded archive this is the same as `data_dir`.
+
+        """
+        if self.is_mounted(self._fmt.DATA_DIR):
+            return self.data_dir
+        data_dir = qiime2.core.path.InPath(self._fmt.data_dir)
+        data_dir._members = _LazyMembers(self, self._fmt.DATA_DIR)
+        self._fmt.data_dir.mkdir(exist_ok=True)
+        return data_dir
+
     @property
     def root_dir(self):
+        self.mount()
         return self._fmt.path
 
     @property
     def provenance_dir(self):
-        return getattr(self._fmt, 'provenance_dir', None)
+        if not hasattr(self._fmt, 'provenance_dir'):
+            return None
+        self.mount(self._fmt.PROVENANCE_DIR)
+        return self._fmt.provenance_dir
+
+    @property
+    def provenance(self):
+        if not hasattr(self._fmt, 'provenance_dir'):
+            return None
+        if self._provenance is None:
+            self._provenance = Provenance(self)
+        return self._provenance
+
+    @property
+    def ledger(self):
+        """The `ChecksumLedger` of the checksums computed for this archive's
+        files, each valid for as long as its file is unchanged."""
+        return self._ledger
 
     @property
     def citations(self):
-        return getattr(self._fmt, 'citations', cite.Citations())
+        if not hasattr(self._fmt, 'citations'):
+            return cite.Citations()
+        self.mount(self._fmt.PROVENANCE_DIR)
+        return self._fmt.citations
+
+    def save(self, filepath, workers=1, compression=None):
+        self.mount()
+        self.CURRENT_ARCHIVE.save(self.path, filepath, workers=workers,
+                                  compression=compression)
+
+    def get_checksums(self):
+        """Return the recorded checksums of the archive's files.
 
-    def save(self, filepath):
-        self.CURRENT_ARCHIVE.save(self.path, filepath)
+        Keys are paths relative to the root directory. Returns None for
+        archive versions which don't record checksums.
 
-    def validate_checksums(self):
+        """
         if not isinstance(self._fmt, self.get_format_class('5')):
+            return None
+
+        with (self.root_dir / self._fmt.CHECKSUM_FILE).open() as fh:
+            return collections.OrderedDict(
+                from_checksum_format(line) for line in fh.readlines())
+
+    def validate_checksums(self, incremental=False, sample=None, workers=1,
+                           fail_fast=False):
+        """Compare the archive's files against its recorded checksums.
+
+        Parameters
+        ----------
+        incremental : bool, optional
+            Only re-hash files whose size or modification time changed since
+            they were last hashed by this archiver (e.g. when the archive was
+            written or last validated). Files extracted from a loaded archive
+            are always hashed the first time.
+        sample : int, optional
+            Only hash this many of the recorded files, chosen at random.
+            Added and removed files are always detected.
+        workers : int, optional
+            Number of threads hashing files (None uses one per CPU).
+        fail_fast : bool, optional
+            Return as soon as the first difference is found, in which case
+            the diff is incomplete.
+
+        Returns
+        -------
+        ChecksumDiff
+
+        """
+        exp = self.get_checksums()
+        if exp is None:
             return ChecksumDiff({}, {}, {})
 
-        obs = dict(x for x in md5sum_directory(str(self.root_dir)).items()
-                   if x[0] != self._fmt.CHECKSUM_FILE)
-        exp = dict(from_checksum_format(line) for line in
-                   (self.root_dir / self._fmt.CHECKSUM_FILE).open().readlines()
-                   )
+        obs = find_files(self.root_dir)
+        obs.pop(self._fmt.CHECKSUM_FILE, None)
         obs_keys = set(obs)
         exp_keys = set(exp)
 
-        added = {x: obs[x] for x in obs_keys - exp_keys}
+        added = {x: md5sum(obs[x]) for x in obs_keys - exp_keys}
         removed = {x: exp[x] for x in exp_keys - obs_keys}
-        changed = {x: (exp[x], obs[x]) for x in exp_keys & obs_keys
-                   if exp[x] != obs[x]}
+        changed = {}
+        if fail_fast and (added or removed):
+            return ChecksumDiff(added=added, removed=removed, changed=changed)
+
+        keys = sorted(exp_keys & obs_keys)
+        if sample is not None and sample < len(keys):
+            keys = sorted(random.sample(keys, sample))
+
+        def check(key):
+            obs_checksum = self._ledger.md5sum(obs[key], cached=incremental)
+            return key, obs_checksum
+
+        if workers is None:
+            workers = os.cpu_count() or 1
+        with concurrent.futures.ThreadPoolExecutor(max(workers, 1)) as pool:
+            futures = [pool.submit(check, key) for key in keys]
+            for future in concurrent.futures.as_completed(futures):
+                key, obs_checksum = future.result()
+                if obs_checksum != exp[key]:
+                    changed[key] = (exp[key], obs_checksum)
+                    if fail_fast:
+                        for future in futures:
+                            future.cancel()
+                        break
 
         return ChecksumDiff(added=added, removed=removed, changed=changed)
 
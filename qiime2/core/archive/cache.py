@@ -0,0 +1,99 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2016-2020, QIIME 2 development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# ----------------------------------------------------------------------------
+
+import hashlib
+import os
+import pathlib
+import shutil
+import stat
+
+from qiime2.core.cache import DiskCache
+from qiime2.core.util import (md5sum_directory, from_checksum_format,
+                              link_or_copy)
+
+
+class ExtractionCache(DiskCache):
+    """A size-bounded, on-disk cache of extracted archives.
+
+    Entries are keyed by an archive's UUID and the MD5 of its `checksums.md5`
+    file, so only archives which record checksums (format version 5 onwards)
+    are cached. An entry is verified against those checksums before it is
+    published and its files are made read-only, after which it may be shared
+    by any number of processes. Loading a cached archive hardlinks the entry
+    into the archive's temporary directory (falling back to a copy when the
+    cache is on a different filesystem) instead of inflating the zip again.
+
+    See `qiime2.core.cache.DiskCache` for the parameters.
+
+    """
+    def get_key(self, archive):
+        try:
+            with archive.open('checksums.md5') as fh:
+                checksums = fh.read()
+        except KeyError:
+            return None
+        digest = hashlib.md5(checksums.encode('utf-8')).hexdigest()
+        return '%s-%s' % (archive.uuid, digest)
+
+    def mount(self, archive, filepath, add=True):
+        """Mount `archive` into `filepath` from the cache.
+
+        If `add` is True, the archive is added to the cache first when it
+        isn't already there.
+
+        Returns
+        -------
+        pathlib.Path or None
+            The root directory of the mounted archive, or None if `archive`
+            isn't (and won't be) cached. In that case nothing is written to
+            `filepath`.
+
+        """
+        key = self.get_key(archive)
+        if key is None:
+            return None
+
+        entry = self._get_entry(key)
+        if entry is None:
+            if not add or not self._publish(
+                    key, lambda staging: self._build(archive, staging)):
+                return None
+            entry = self._entries / key
+
+        root = pathlib.Path(filepath) / str(archive.uuid)
+        try:
+            shutil.copytree(str(entry / str(archive.uuid)), str(root),
+                            copy_function=link_or_copy)
+        except FileNotFoundError:
+            # Evicted by another process while it was being linked.
+            if root.exists():
+                shutil.rmtree(str(root))
+            return None
+
+        return root
+
+    def _build(self, archive, staging):
+        root = archive.extract(staging)
+        if not self._verify(root):
+            return None
+
+        size = 0
+        for dirpath, _, filenames in os.walk(str(root)):
+            for filename in filenames:
+                fp = os.path.join(dirpath, filename)
+                size += os.path.getsize(fp)
+                os.chmod(fp, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+        return size
+
+    def _verify(self, root):
+        checksum_fp = root / 'checksums.md5'
+        with checksum_fp.open() as fh:
+            exp = dict(from_checksum_format(line) for line in fh.readlines())
+        obs = md5sum_directory(root)
+        obs.pop('checksums.md5', None)
+        return obs == exp
@@ -71,6 +71,7 @@ class TestArtifactVersion(unittest.TestCase, ArchiveTestingMixin):
             'provenance/metadata.yaml',
             'provenance/VERSION',
             'provenance/citations.bib',
+            'provenance/index.json',
             'provenance/action/action.yaml',
         }
         self.assertArchiveMembers(fp, root_dir, expected)
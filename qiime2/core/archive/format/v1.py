@@ -14,9 +14,9 @@ class ArchiveFormat(v0.ArchiveFormat):
 
     @classmethod
     def write(cls, archive_record, type, format, data_initializer,
-              provenance_capture):
+              provenance_capture, ledger=None):
         super().write(archive_record, type, format, data_initializer,
-                      provenance_capture)
+                      provenance_capture, ledger=ledger)
         root = archive_record.root
 
         prov_dir = root / cls.PROVENANCE_DIR
@@ -16,11 +16,11 @@ class ArchiveFormat(v4.ArchiveFormat):
 
     @classmethod
     def write(cls, archive_record, type, format, data_initializer,
-              provenance_capture):
+              provenance_capture, ledger=None):
         super().write(archive_record, type, format, data_initializer,
-                      provenance_capture)
+                      provenance_capture, ledger=ledger)
 
-        checksums = md5sum_directory(str(archive_record.root))
+        checksums = md5sum_directory(str(archive_record.root), ledger=ledger)
         with (archive_record.root / cls.CHECKSUM_FILE).open('w') as fh:
             for item in checksums.items():
                 fh.write(to_checksum_format(*item))
@@ -12,11 +12,14 @@ import pkg_resources
 import uuid
 import copy
 import importlib
+import hashlib
+import json
 import shutil
 import sys
+import threading
 from datetime import datetime, timezone
 
-import distutils
+import pandas as pd
 import yaml
 import tzlocal
 import dateutil.relativedelta as relativedelta
@@ -26,6 +29,88 @@ import qiime2.core.util as util
 from qiime2.core.cite import Citations
 
 
+# The distributions of the working set and their versions are the same for
+# every action in a process (unless the working set itself changes), so they
+# are only looked up once.
+_python_packages = (None, None)
+
+
+def _get_python_packages():
+    global _python_packages
+
+    working_set = pkg_resources.working_set
+    key = (id(working_set), tuple(working_set.entries),
+           len(working_set.by_key))
+    cached_key, packages = _python_packages
+    if cached_key != key:
+        packages = collections.OrderedDict(
+            (d.project_name, d.version) for d in working_set)
+        _python_packages = (key, packages)
+    return packages.copy()
+
+
+def get_metadata_digest(metadata):
+    """Return the MD5 of the contents of a Metadata or MetadataColumn."""
+    if isinstance(metadata, qiime2.Metadata):
+        columns = [(name, props.type)
+                   for name, props in metadata.columns.items()]
+    else:
+        columns = [(metadata.name, metadata.type)]
+    digest = hashlib.md5()
+    digest.update(repr([metadata.id_header, columns]).encode('utf-8'))
+    digest.update(
+        pd.util.hash_pandas_object(metadata.to_dataframe()).values.tobytes())
+    return digest.hexdigest()
+
+
+class _MetadataStore:
+    """Metadata recorded in provenance, keyed by the digest of its contents.
+
+    Each distinct table is only written once and then linked into every
+    action directory which records it. Only the `max_files` most recently
+    recorded tables are kept; the links already made outlive them.
+
+    """
+    MAX_FILES = 32
+
+    def __init__(self, max_files=None):
+        self.max_files = self.MAX_FILES if max_files is None else max_files
+        self._files = collections.OrderedDict()
+        self._dir = None
+        self._lock = threading.Lock()
+
+    def save(self, metadata, filepath):
+        digest = get_metadata_digest(metadata)
+        with self._lock:
+            saved = self._files.pop(digest, None)
+            if saved is None:
+                if self._dir is None:
+                    self._dir = qiime2.core.path.ProvenancePath()
+                saved = self._dir / (digest + '.tsv')
+                metadata.save(str(saved))
+            self._files[digest] = saved
+            # Linked while locked, so that the file can't be evicted first.
+            util.link_or_copy(str(saved), str(filepath))
+
+            while len(self._files) > self.max_files:
+                _, evicted = self._files.popitem(last=False)
+                try:
+                    evicted.unlink()
+                except FileNotFoundError:
+                    pass
+
+    def clear(self):
+        """Remove every stored table."""
+        with self._lock:
+            self._files.clear()
+            if self._dir is not None:
+                self._dir._destructor()
+                self._dir = None
+
+
+_metadata_store = _MetadataStore()
+
+
 def _ts_to_date(ts):
     time_zone = timezone.utc
     try:
@@ -107,17 +192,69 @@ yaml.add_representer(CitationKey, lambda dumper, data:
                      dumper.represent_scalar('!cite', data.key))
 
 
+# The representers above are registered on the global (pure-Python) dumper
+# for anyone else dumping these types. Provenance itself is written with the
+# libyaml emitter when it is available, which produces the same documents
+# much faster.
+class ProvenanceDumper(getattr(yaml, 'CDumper', yaml.Dumper)):
+    yaml_representers = yaml.Dumper.yaml_representers.copy()
+    yaml_multi_representers = yaml.Dumper.yaml_multi_representers.copy()
+
+    def represent_scalar(self, tag, value, style=None):
+        # The pure-Python emitter quotes any scalar whose tag can't be
+        # implied (e.g. `!ref 'a:b'`) where libyaml would leave it plain, so
+        # ask for that explicitly to keep the output identical.
+        if style is None and tag != self.resolve(yaml.ScalarNode, value,
+                                                 (True, False)):
+            style = "'"
+        return super().represent_scalar(tag, value, style=style)
+
+
+def _dump(data):
+    return yaml.dump(data, Dumper=ProvenanceDumper, default_flow_style=False,
+                     indent=4)
+
+
+# The environment barely changes within a session, so each entry of that
+# section is rendered once and reused for as long as its value is the same.
+_env_fragments = {}
+
+
+def _dump_env_section(env):
+    text = ['environment:\n']
+    for key, value in env.items():
+        cached = _env_fragments.get(key)
+        if cached is not None and cached[0] == value:
+            text.append(cached[1])
+            continue
+        fragment = _dump({'environment': collections.OrderedDict(
+            [(key, value)])})[len(text[0]):]
+        _env_fragments[key] = (copy.deepcopy(value), fragment)
+        text.append(fragment)
+    return ''.join(text)
+
+
 class ProvenanceCapture:
     ANCESTOR_DIR = 'artifacts'
     ACTION_DIR = 'action'
     ACTION_FILE = 'action.yaml'
     CITATION_FILE = 'citations.bib'
+    INDEX_FILE = 'index.json'
+    INDEX_VERSION = 1
+    # How many generations (at least one) of ancestors to keep in
+    # provenance. Results further back are recorded by UUID only (in the
+    # index, as "pruned" nodes), which keeps long chains of actions from
+    # growing the provenance of every step. None keeps the complete history.
+    MAX_DEPTH = None
 
     def __init__(self):
         self.start = time.time()
         self.uuid = uuid.uuid4()
         self.end = None
         self.plugins = collections.OrderedDict()
+        # UUIDs of the results this one was directly derived from, in the
+        # order they were added, and their provenance index (or None).
+        self.parents = collections.OrderedDict()
 
         # For the purposes of this dict, `return` is a special case for output
         # we expect to transform this later when serializing, but this lets
@@ -156,27 +293,69 @@ class ProvenanceCapture:
             # version 0 artifacts in the wild to be important in practice.
             # NOTE: this implies that it is possible for an action.yaml file to
             # contain an artifact UUID that is not in the artifacts/ directory.
+            self.parents[str(artifact.uuid)] = None
             return NoProvenance(artifact.uuid)
 
+        # Only the root of the provenance has an index, which already
+        # describes every ancestor, so the ancestors' own are not copied.
+        self.parents[str(artifact.uuid)] = self._read_index(other_path)
+
         destination = self.ancestor_dir / str(artifact.uuid)
-        # If it exists, then the artifact is already in the provenance
-        # (and so are its ancestors)
+        if self.MAX_DEPTH is None:
+            # If it exists, then the artifact is already in the provenance
+            # (and so are its ancestors)
+            if destination.exists():
+                return str(artifact.uuid)
+            keep = None
+        else:
+            if self.MAX_DEPTH < 1:
+                raise ValueError("MAX_DEPTH must be at least 1 (or None), "
+                                 "not %r." % self.MAX_DEPTH)
+            # The artifact may already be here as a distant ancestor whose
+            # own ancestors were pruned, so those are revisited either way.
+            keep = self._get_ancestors_within(artifact, self.MAX_DEPTH - 1)
+
+        # Provenance files are never modified once written, so every result
+        # descending from an ancestor can share the same files instead of
+        # each having a copy.
+        # Handle root node of ancestor
         if not destination.exists():
-            # Handle root node of ancestor
             shutil.copytree(
                 str(other_path), str(destination),
-                ignore=shutil.ignore_patterns(self.ANCESTOR_DIR + '*'))
-
-            # Handle ancestral nodes of ancestor
-            grandcestor_path = other_path / self.ANCESTOR_DIR
-            if grandcestor_path.exists():
-                for grandcestor in grandcestor_path.iterdir():
-                    destination = self.ancestor_dir / grandcestor.name
-                    if not destination.exists():
-                        shutil.copytree(str(grandcestor), str(destination))
+                ignore=shutil.ignore_patterns(self.ANCESTOR_DIR + '*',
+                                              self.INDEX_FILE),
+                copy_function=util.link_or_copy)
+
+        # Handle ancestral nodes of ancestor
+        grandcestor_path = other_path / self.ANCESTOR_DIR
+        if grandcestor_path.exists():
+            for grandcestor in grandcestor_path.iterdir():
+                if keep is not None and grandcestor.name not in keep:
+                    continue
+                destination = self.ancestor_dir / grandcestor.name
+                if not destination.exists():
+                    shutil.copytree(str(grandcestor), str(destination),
+                                    copy_function=util.link_or_copy)
 
         return str(artifact.uuid)
 
+    def _get_ancestors_within(self, artifact, generations):
+        """UUIDs of the ancestors of `artifact` which are at most
+        `generations` steps away from it.
+
+        """
+        seen = set()
+        frontier = [artifact._archiver.provenance.root]
+        for _ in range(generations):
+            parents = []
+            for node in frontier:
+                for parent in node.parents:
+                    if parent.uuid not in seen:
+                        seen.add(parent.uuid)
+                        parents.append(parent)
+            frontier = parents
+        return seen
+
     def make_citation_key(self, domain, package=None, identifier=None,
                           index=0):
         if domain == 'framework':
@@ -211,8 +390,7 @@ class ProvenanceCapture:
         return ForwardRef('environment:plugins:' + plugin.name)
 
     def capture_env(self):
-        return collections.OrderedDict(
-            (d.project_name, d.version) for d in pkg_resources.working_set)
+        return _get_python_packages()
 
     def transformation_recorder(self, name):
         section = self.transformers[name] = []
@@ -290,25 +468,102 @@ class ProvenanceCapture:
         return env
 
     def write_action_yaml(self):
-        settings = dict(default_flow_style=False, indent=4)
         with (self.action_dir / self.ACTION_FILE).open(mode='w') as fh:
-            fh.write(yaml.dump({'execution': self.make_execution_section()},
-                               **settings))
+            fh.write(_dump({'execution': self.make_execution_section()}))
             fh.write('\n')
-            fh.write(yaml.dump({'action': self.make_action_section()},
-                               **settings))
+            fh.write(_dump({'action': self.make_action_section()}))
             if self.transformers:  # pipelines don't have these
                 fh.write('\n')
-                fh.write(yaml.dump(
-                    {'transformers': self.make_transformers_section()},
-                    **settings))
+                fh.write(_dump(
+                    {'transformers': self.make_transformers_section()}))
             fh.write('\n')
-            fh.write(yaml.dump({'environment': self.make_env_section()},
-                               **settings))
+            fh.write(_dump_env_section(self.make_env_section()))
 
     def write_citations_bib(self):
         self.citations.save(str(self.path / self.CITATION_FILE))
 
+    def make_index_node(self, node_dir):
+        with (node_dir / 'metadata.yaml').open() as fh:
+            metadata = yaml.safe_load(fh)
+        node = collections.OrderedDict()
+        node['type'] = metadata['type']
+        node['format'] = metadata['format']
+        node['action'] = None
+        node['parents'] = None
+        return metadata['uuid'], node
+
+    def _make_index_stub(self, node):
+        stub = collections.OrderedDict()
+        stub['type'] = node['type']
+        stub['format'] = node['format']
+        stub['action'] = None
+        stub['parents'] = None
+        stub['pruned'] = True
+        return stub
+
+    def _read_index(self, node_dir):
+        try:
+            with (node_dir / self.INDEX_FILE).open() as fh:
+                return json.load(fh, object_pairs_hook=collections.OrderedDict)
+        except FileNotFoundError:
+            return None
+
+    def write_index(self):
+        """Write a summary of the whole provenance graph to `index.json`.
+
+        Every result in the graph (this one and all of its ancestors) is a
+        node keyed by its UUID, recording its type and format, the action
+        which created it, and the UUIDs of its parents, so lineage can be
+        answered without parsing every action.yaml. Ancestors predating the
+        index have an `action` and `parents` of null, and parents without
+        any provenance (archive version 0) have no node at all. Ancestors
+        pruned by `MAX_DEPTH` are marked `pruned` and have null `action` and
+        `parents` as well.
+
+        """
+        # The index of each parent already covers that parent's ancestors.
+        nodes = collections.OrderedDict()
+        for index in self.parents.values():
+            if index is None:
+                continue
+            for uuid_, node in index['nodes'].items():
+                # One parent may have pruned an ancestor which another
+                # parent kept, whatever order the parents come in.
+                if node.get('pruned') and uuid_ in nodes:
+                    continue
+                nodes[uuid_] = node
+        # Ancestors which no parent's index describes predate the index.
+        kept = {ancestor.name for ancestor in self.ancestor_dir.iterdir()}
+        for uuid_ in sorted(kept):
+            if uuid_ not in nodes or nodes[uuid_].get('pruned'):
+                nodes[uuid_] = self.make_index_node(
+                    self.ancestor_dir / uuid_)[1]
+
+        # Nodes pruned from the provenance are only kept as stubs where
+        # something that remains refers to them.
+        referenced = set(self.parents)
+        for uuid_ in kept:
+            referenced.update(nodes[uuid_]['parents'] or ())
+        for uuid_ in list(nodes):
+            if uuid_ in kept:
+                continue
+            if uuid_ in referenced:
+                nodes[uuid_] = self._make_index_stub(nodes[uuid_])
+            else:
+                del nodes[uuid_]
+
+        root, node = self.make_index_node(self.path)
+        node['action'] = self.make_index_action()
+        node['parents'] = list(self.parents)
+        nodes[root] = node
+
+        index = collections.OrderedDict()
+        index['version'] = self.INDEX_VERSION
+        index['root'] = root
+        index['nodes'] = nodes
+        with (self.path / self.INDEX_FILE).open(mode='w') as fh:
+            json.dump(index, fh, separators=(',', ':'))
+
     def finalize(self, final_path, node_members):
         self.end = time.time()
 
@@ -317,6 +572,7 @@ class ProvenanceCapture:
 
         self.write_action_yaml()
         self.write_citations_bib()
+        self.write_index()
 
         self.path.rename(final_path)
 
@@ -326,10 +582,29 @@ class ProvenanceCapture:
         forked.plugins = forked.plugins.copy()
         forked.transformers = forked.transformers.copy()
         forked.citations = forked.citations.copy()
+        forked.parents = forked.parents.copy()
         # create a copy of the backing dir so factory (the hard stuff is
         # mostly done by this point)
         forked._build_paths()
-        distutils.dir_util.copy_tree(str(self.path), str(forked.path))
+        # Ancestors are never modified, so forks share (hardlink) them and
+        # only get their own copy of what they may still write to.
+        for ancestor in self.ancestor_dir.iterdir():
+            shutil.copytree(str(ancestor),
+                            str(forked.ancestor_dir / ancestor.name),
+                            copy_function=util.link_or_copy)
+        for child in self.path.iterdir():
+            if child.name == self.ANCESTOR_DIR:
+                continue
+            if child.is_dir():
+                # Nothing in here changes once written (action.yaml only
+                # appears when finalizing), so it is shared as well.
+                destination = forked.path / child.name
+                if destination.exists():
+                    destination.rmdir()  # still empty from `_build_paths`
+                shutil.copytree(str(child), str(destination),
+                                copy_function=util.link_or_copy)
+            else:
+                shutil.copy(str(child), str(forked.path))
 
         return forked
 
@@ -352,6 +627,13 @@ class ImportProvenanceCapture(ProvenanceCapture):
 
         return action
 
+    def make_index_action(self):
+        action = collections.OrderedDict()
+        action['execution'] = str(self.uuid)
+        action['type'] = 'import'
+        action['format'] = self.format_name
+        return action
+
 
 class ActionProvenanceCapture(ProvenanceCapture):
     def __init__(self, action_type, import_path, action_id):
@@ -384,7 +666,7 @@ class ActionProvenanceCapture(ProvenanceCapture):
             uuid_ref = ",".join(uuids) + ":"
 
         relpath = name + '.tsv'
-        value.save(str(self.action_dir / relpath))
+        _metadata_store.save(value, self.action_dir / relpath)
 
         return MetadataPath(uuid_ref + relpath)
 
@@ -425,6 +707,20 @@ class ActionProvenanceCapture(ProvenanceCapture):
 
         return action
 
+    def make_index_action(self):
+        action = collections.OrderedDict()
+        action['execution'] = str(self.uuid)
+        action['type'] = self.action_type
+        action['plugin'] = self._plugin.name
+        action['action'] = self.action.id
+        action['output-name'] = self.output_name
+        # Parameters are summarized by the digest of their action.yaml
+        # representation, which is enough to tell whether two results were
+        # made the same way.
+        action['parameters-digest'] = hashlib.md5(
+            _dump(self.parameters).encode('utf-8')).hexdigest()
+        return action
+
     def fork(self, name):
         forked = super().fork()
         forked.output_name = name
@@ -438,8 +734,218 @@ class PipelineProvenanceCapture(ActionProvenanceCapture):
 
         return action
 
+    def make_index_action(self):
+        action = super().make_index_action()
+        action['alias-of'] = str(self.alias.uuid)
+        return action
+
     def fork(self, name, alias):
         forked = super().fork(name)
         forked.alias = alias
         forked.add_ancestor(alias)
         return forked
+
+
+class ProvenanceLoader(getattr(yaml, 'CSafeLoader', yaml.SafeLoader)):
+    """Reads action.yaml back into the types it was written from."""
+
+
+for _tag, _type in [('!ref', ForwardRef), ('!no-provenance', NoProvenance),
+                    ('!metadata', MetadataPath), ('!color', ColorPrimitive),
+                    ('!cite', CitationKey)]:
+    ProvenanceLoader.add_constructor(
+        _tag, lambda loader, node, _type=_type:
+        _type(loader.construct_scalar(node)))
+
+ProvenanceLoader.add_constructor(
+    '!set', lambda loader, node: set(loader.construct_sequence(node)))
+
+
+def _merge_key_values(items):
+    # The inverse of the OrderedKeyValue representer.
+    merged = collections.OrderedDict()
+    for item in items or ():
+        merged.update(item)
+    return merged
+
+
+class ProvenanceNode:
+    """A result in a provenance graph.
+
+    The node's action.yaml is only read (and then kept) the first time any
+    of its details are needed.
+
+    """
+    def __init__(self, provenance, uuid, relpath, entry=None):
+        self._provenance = provenance
+        self.uuid = uuid
+        self._relpath = relpath
+        self._entry = entry
+        self._action = None
+
+    def __repr__(self):
+        return '<%s %s>' % (self.__class__.__name__, self.uuid)
+
+    def _read(self, name):
+        return self._provenance._read(self._relpath + '/' + name)
+
+    @property
+    def type(self):
+        if self._entry is not None:
+            return self._entry['type']
+        return yaml.load(self._read('metadata.yaml'),
+                         Loader=ProvenanceLoader)['type']
+
+    @property
+    def action(self):
+        """The parsed action.yaml of this node."""
+        if self._action is None:
+            self._action = yaml.load(
+                self._read(ProvenanceCapture.ACTION_DIR + '/' +
+                           ProvenanceCapture.ACTION_FILE),
+                Loader=ProvenanceLoader)
+        return self._action
+
+    @property
+    def inputs(self):
+        return _merge_key_values(self.action['action'].get('inputs'))
+
+    @property
+    def parameters(self):
+        return _merge_key_values(self.action['action'].get('parameters'))
+
+    @property
+    def pruned(self):
+        """Whether only the UUID of this node was kept (see
+        `ProvenanceCapture.MAX_DEPTH`), in which case it has no action.
+
+        """
+        return self._entry is not None and self._entry.get('pruned', False)
+
+    @property
+    def parent_uuids(self):
+        if self.pruned:
+            return []
+        if self._entry is not None and self._entry['parents'] is not None:
+            return list(self._entry['parents'])
+
+        action = self.action['action']
+        parents = collections.OrderedDict()
+
+        def add(value):
+            if isinstance(value, NoProvenance):
+                value = value.uuid
+            if isinstance(value, str):
+                parents[value] = None
+
+        for value in self.inputs.values():
+            if isinstance(value, (list, set)):
+                for item in value:
+                    add(item)
+            else:
+                add(value)
+        for value in self.parameters.values():
+            if isinstance(value, MetadataPath) and ':' in value.path:
+                for uuid_ in value.path.split(':', 1)[0].split(','):
+                    add(uuid_)
+        if 'alias-of' in action:
+            add(action['alias-of'])
+        return list(parents)
+
+    @property
+    def parents(self):
+        """The nodes this result was directly derived from, in no particular
+        order.
+
+        Parents without provenance (archive version 0) are skipped.
+
+        """
+        return [self._provenance[uuid_] for uuid_ in self.parent_uuids
+                if uuid_ in self._provenance]
+
+
+class Provenance:
+    """The provenance graph of a result, read lazily from its archive.
+
+    Nodes are looked up by UUID and iterate in no particular order. Only the
+    provenance index (or, for results written before it existed, the list
+    of members) is read up front; a lazily loaded result is never extracted
+    to answer these queries.
+
+    """
+    def __init__(self, archiver):
+        self._archiver = archiver
+        self._prov_dir = archiver._fmt.PROVENANCE_DIR
+        self._nodes = None
+        self._root = None
+
+    def _read(self, relpath):
+        with self._archiver.open(self._prov_dir + '/' + relpath) as fh:
+            return fh.read()
+
+    def _load(self):
+        if self._nodes is not None:
+            return
+        root = str(self._archiver.uuid)
+        try:
+            index = json.loads(self._read(ProvenanceCapture.INDEX_FILE))
+        except FileNotFoundError:
+            index = None
+
+        nodes = {}
+        if index is not None:
+            for uuid_, entry in index['nodes'].items():
+                relpath = ('.' if uuid_ == root else
+                           ProvenanceCapture.ANCESTOR_DIR + '/' + uuid_)
+                nodes[uuid_] = ProvenanceNode(self, uuid_, relpath, entry)
+        else:
+            nodes[root] = ProvenanceNode(self, root, '.')
+            ancestors = set()
+            for path in self._archiver.iter_files(self._prov_dir):
+                parts = path.parts
+                if len(parts) > 2 and parts[0] == \
+                        ProvenanceCapture.ANCESTOR_DIR:
+                    ancestors.add(parts[1])
+            for uuid_ in ancestors:
+                nodes[uuid_] = ProvenanceNode(
+                    self, uuid_, ProvenanceCapture.ANCESTOR_DIR + '/' + uuid_)
+
+        self._root = nodes[root]
+        self._nodes = nodes
+
+    @property
+    def root(self):
+        """The node of the result itself."""
+        self._load()
+        return self._root
+
+    def __getitem__(self, uuid):
+        self._load()
+        return self._nodes[str(uuid)]
+
+    def __contains__(self, uuid):
+        self._load()
+        return str(uuid) in self._nodes
+
+    def __iter__(self):
+        self._load()
+        return iter(self._nodes.values())
+
+    def __len__(self):
+        self._load()
+        return len(self._nodes)
+
+    def ancestors(self, uuid=None):
+        """Yield each ancestor of the node `uuid` (by default the root) once,
+        nearest first.
+
+        """
+        start = self.root if uuid is None else self[uuid]
+        seen = {start.uuid}
+        queue = collections.deque([start])
+        while queue:
+            for parent in queue.popleft().parents:
+                if parent.uuid not in seen:
+                    seen.add(parent.uuid)
+                    queue.append(parent)
+                    yield parent
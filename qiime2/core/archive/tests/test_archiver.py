@@ -9,17 +9,56 @@
 import os
 import tempfile
 import unittest
+import unittest.mock as mock
 import uuid
 import zipfile
 import pathlib
 
-from qiime2.core.archive import Archiver
+from qiime2.core.archive import Archiver, CompressionPolicy
 from qiime2.core.archive import ImportProvenanceCapture
 from qiime2.core.archive.archiver import _ZipArchive
 from qiime2.core.archive.format.util import artifact_version
 from qiime2.core.testing.format import IntSequenceDirectoryFormat
 from qiime2.core.testing.type import IntSequence1
 from qiime2.core.testing.util import ArchiveTestingMixin
+import qiime2.core.util as util
+
+
+class TestCompressionPolicy(unittest.TestCase):
+    def test_default(self):
+        policy = CompressionPolicy()
+
+        self.assertEqual(policy.get_level('data/seqs.fastq.gz', 10), -1)
+        self.assertEqual(policy.get_level('empty.txt', 0), -1)
+
+    def test_extensions(self):
+        policy = CompressionPolicy(
+            level=3, extensions={'.gz': None, '.FASTQ.GZ': 1})
+
+        self.assertEqual(policy.get_level('data/seqs.fastq.gz', 10), 1)
+        self.assertIsNone(policy.get_level('data/seqs.txt.gz', 10))
+        self.assertEqual(policy.get_level('data/seqs.txt', 10), 3)
+
+    def test_store_compressed(self):
+        policy = CompressionPolicy(store_compressed=True,
+                                   extensions={'.png': 9})
+
+        self.assertIsNone(policy.get_level('data/seqs.fastq.gz', 10))
+        self.assertIsNone(policy.get_level('data/table.biom', 10))
+        self.assertEqual(policy.get_level('data/plot.png', 10), 9)
+        self.assertEqual(policy.get_level('data/seqs.fastq', 10), -1)
+
+    def test_store_below(self):
+        policy = CompressionPolicy(level=9, store_below=100)
+
+        self.assertIsNone(policy.get_level('data/seqs.fastq', 99))
+        self.assertEqual(policy.get_level('data/seqs.fastq', 100), 9)
+
+    def test_invalid_level(self):
+        with self.assertRaisesRegex(ValueError, 'compression level: 10'):
+            CompressionPolicy(level=10)
+        with self.assertRaisesRegex(ValueError, "compression level: 'x'"):
+            CompressionPolicy(extensions={'.gz': 'x'})
 
 
 class TestArchiver(unittest.TestCase, ArchiveTestingMixin):
@@ -93,6 +132,7 @@ class TestArchiver(unittest.TestCase, ArchiveTestingMixin):
             'provenance/metadata.yaml',
             'provenance/VERSION',
             'provenance/citations.bib',
+            'provenance/index.json',
             'provenance/action/action.yaml'
         }
 
@@ -112,11 +152,167 @@ class TestArchiver(unittest.TestCase, ArchiveTestingMixin):
             'provenance/metadata.yaml',
             'provenance/VERSION',
             'provenance/citations.bib',
+            'provenance/index.json',
             'provenance/action/action.yaml'
         }
 
         self.assertArchiveMembers(fp, root_dir, expected)
 
+    def test_save_parallel(self):
+        serial_fp = os.path.join(self.temp_dir.name, 'serial.zip')
+        parallel_fp = os.path.join(self.temp_dir.name, 'parallel.zip')
+
+        self.archiver.save(serial_fp)
+        self.archiver.save(parallel_fp, workers=2)
+
+        with open(serial_fp, 'rb') as fh:
+            exp = fh.read()
+        with open(parallel_fp, 'rb') as fh:
+            obs = fh.read()
+        self.assertEqual(obs, exp)
+
+    def test_save_parallel_large_members(self):
+        source = pathlib.Path(self.temp_dir.name) / 'source'
+        (source / 'nested').mkdir(parents=True)
+        (source / 'small.txt').write_text('small\n')
+        (source / 'nested' / 'empty.txt').write_text('')
+        # Spans several read chunks and spills to disk once compressed.
+        with (source / 'nested' / 'large.bin').open('wb') as fh:
+            for i in range(3 * 1024):
+                fh.write(os.urandom(512) + bytes(512))
+
+        serial_fp = os.path.join(self.temp_dir.name, 'serial.zip')
+        parallel_fp = os.path.join(self.temp_dir.name, 'parallel.zip')
+        _ZipArchive.save(source, serial_fp)
+        _ZipArchive._SPOOL_SIZE, spool_size = 1024, _ZipArchive._SPOOL_SIZE
+        try:
+            _ZipArchive.save(source, parallel_fp, workers=None)
+        finally:
+            _ZipArchive._SPOOL_SIZE = spool_size
+
+        with open(serial_fp, 'rb') as fh:
+            exp = fh.read()
+        with open(parallel_fp, 'rb') as fh:
+            obs = fh.read()
+        self.assertEqual(obs, exp)
+        with zipfile.ZipFile(parallel_fp) as zf:
+            self.assertIsNone(zf.testzip())
+            self.assertEqual(zf.read('nested/large.bin'),
+                             (source / 'nested' / 'large.bin').read_bytes())
+
+    def test_save_parallel_unsupported_python(self):
+        source = pathlib.Path(self.temp_dir.name) / 'source'
+        source.mkdir()
+        (source / 'table.tsv').write_text('a\tb\n' * 1024)
+        (source / 'tiny.txt').write_text('tiny\n')
+        serial_fp = os.path.join(self.temp_dir.name, 'serial.zip')
+        parallel_fp = os.path.join(self.temp_dir.name, 'parallel.zip')
+        _ZipArchive.save(source, serial_fp)
+
+        with mock.patch.object(_ZipArchive, '_APPEND_VERSIONS',
+                               ((3, 0), (3, 0))), \
+                mock.patch.object(_ZipArchive, '_append_member') as append:
+            self.assertFalse(_ZipArchive._can_append(None))
+            _ZipArchive.save(source, parallel_fp, workers=2)
+
+        self.assertEqual(append.call_count, 0)
+        with open(serial_fp, 'rb') as fh:
+            exp = fh.read()
+        with open(parallel_fp, 'rb') as fh:
+            self.assertEqual(fh.read(), exp)
+
+    def test_save_compression_policy(self):
+        source = pathlib.Path(self.temp_dir.name) / 'source'
+        source.mkdir()
+        (source / 'reads.fastq.gz').write_bytes(os.urandom(1024))
+        (source / 'table.tsv').write_text('a\tb\n' * 1024)
+        (source / 'tiny.txt').write_text('tiny\n')
+        (source / 'notes.TXT').write_text('notes\n' * 1024)
+
+        policy = CompressionPolicy(level=1, extensions={'.txt': 9},
+                                   store_compressed=True, store_below=16)
+
+        for workers in 1, 2:
+            fp = os.path.join(self.temp_dir.name, '%d.zip' % workers)
+            _ZipArchive.save(source, fp, workers=workers, compression=policy)
+
+            with zipfile.ZipFile(fp) as zf:
+                self.assertIsNone(zf.testzip())
+                self.assertEqual(zf.getinfo('reads.fastq.gz').compress_type,
+                                 zipfile.ZIP_STORED)
+                self.assertEqual(zf.getinfo('tiny.txt').compress_type,
+                                 zipfile.ZIP_STORED)
+                for name in 'table.tsv', 'notes.TXT':
+                    self.assertEqual(zf.getinfo(name).compress_type,
+                                     zipfile.ZIP_DEFLATED)
+                    self.assertEqual(zf.read(name),
+                                     (source / name).read_bytes())
+
+        with open(os.path.join(self.temp_dir.name, '1.zip'), 'rb') as fh:
+            exp = fh.read()
+        with open(os.path.join(self.temp_dir.name, '2.zip'), 'rb') as fh:
+            self.assertEqual(fh.read(), exp)
+
+    def test_save_store_all(self):
+        fp = os.path.join(self.temp_dir.name, 'archive.zip')
+
+        self.archiver.save(fp, compression=CompressionPolicy(level=None))
+
+        with zipfile.ZipFile(fp) as zf:
+            self.assertEqual({i.compress_type for i in zf.infolist()},
+                             {zipfile.ZIP_STORED})
+        archiver = Archiver.load(fp)
+        self.assertEqual(archiver.validate_checksums(), ({}, {}, {}))
+
+    def test_peek_opens_archive_once(self):
+        fp = os.path.join(self.temp_dir.name, 'archive.zip')
+        self.archiver.save(fp)
+
+        with mock.patch('zipfile.ZipFile', wraps=zipfile.ZipFile) as zf:
+            uuid_, type_, format_ = Archiver.peek(fp)
+
+        self.assertEqual(zf.call_count, 1)
+        self.assertEqual(uuid_, str(self.archiver.uuid))
+        self.assertEqual(type_, 'IntSequence1')
+        self.assertEqual(format_, 'IntSequenceDirectoryFormat')
+
+    def test_peek_not_an_archive(self):
+        fp = os.path.join(self.temp_dir.name, 'not-an-archive.zip')
+        with open(fp, 'w') as fh:
+            fh.write('not a zip file')
+
+        with self.assertRaisesRegex(ValueError, 'not a QIIME archive'):
+            Archiver.peek(fp)
+        with self.assertRaisesRegex(ValueError, 'not a QIIME archive'):
+            Archiver.peek(self.temp_dir.name)
+        with self.assertRaisesRegex(ValueError, 'does not exist'):
+            Archiver.peek(os.path.join(self.temp_dir.name, 'missing.zip'))
+
+    def test_load_provenance_index(self):
+        fp = os.path.join(self.temp_dir.name, 'archive.zip')
+        self.archiver.save(fp)
+
+        with mock.patch('zipfile.ZipFile', wraps=zipfile.ZipFile) as zf:
+            index = Archiver.load_provenance_index(fp)
+
+        self.assertEqual(zf.call_count, 1)
+        self.assertEqual(index['root'], str(self.archiver.uuid))
+        node = index['nodes'][str(self.archiver.uuid)]
+        self.assertEqual(node['type'], 'IntSequence1')
+        self.assertEqual(node['action']['type'], 'import')
+        self.assertEqual(node['parents'], [])
+
+    def test_load_provenance_index_missing(self):
+        fp = os.path.join(self.temp_dir.name, 'archive.zip')
+        with artifact_version(0):
+            archiver = Archiver.from_data(
+                IntSequence1, IntSequenceDirectoryFormat,
+                data_initializer=lambda data_dir: None,
+                provenance_capture=ImportProvenanceCapture())
+        archiver.save(fp)
+
+        self.assertIsNone(Archiver.load_provenance_index(fp))
+
     def test_load_archive(self):
         fp = os.path.join(self.temp_dir.name, 'archive.zip')
         self.archiver.save(fp)
@@ -130,6 +326,61 @@ class TestArchiver(unittest.TestCase, ArchiveTestingMixin):
                           for p in archiver.data_dir.iterdir()},
                          {'ints.txt'})
 
+    def test_load_archive_lazy(self):
+        fp = os.path.join(self.temp_dir.name, 'archive.zip')
+        self.archiver.save(fp)
+
+        archiver = Archiver.load(fp, lazy=True)
+        root = archiver.path / str(self.archiver.uuid)
+
+        self.assertEqual(archiver.uuid, self.archiver.uuid)
+        self.assertEqual(archiver.type, IntSequence1)
+        self.assertEqual(archiver.format, IntSequenceDirectoryFormat)
+        self.assertEqual({p.name for p in root.iterdir()},
+                         {'VERSION', 'checksums.md5', 'metadata.yaml'})
+
+        self.assertEqual({str(p.relative_to(archiver.data_dir))
+                          for p in archiver.data_dir.iterdir()},
+                         {'ints.txt'})
+        self.assertFalse((root / 'provenance').exists())
+
+        self.assertTrue(archiver.provenance_dir.exists())
+        self.assertTrue((root / 'provenance' / 'action' /
+                         'action.yaml').exists())
+
+    def test_load_archive_lazy_save(self):
+        fp = os.path.join(self.temp_dir.name, 'archive.zip')
+        fp2 = os.path.join(self.temp_dir.name, 'archive2.zip')
+        self.archiver.save(fp)
+
+        archiver = Archiver.load(fp, lazy=True)
+        archiver.data_dir
+        archiver.save(fp2)
+
+        self.assertArchiveMembers(fp2, str(archiver.uuid), {
+            'VERSION',
+            'checksums.md5',
+            'metadata.yaml',
+            'data/ints.txt',
+            'provenance/metadata.yaml',
+            'provenance/VERSION',
+            'provenance/citations.bib',
+            'provenance/index.json',
+            'provenance/action/action.yaml'
+        })
+        diff = archiver.validate_checksums()
+        self.assertEqual(diff, ({}, {}, {}))
+
+    def test_load_archive_lazy_modified(self):
+        fp = os.path.join(self.temp_dir.name, 'archive.zip')
+        self.archiver.save(fp)
+
+        archiver = Archiver.load(fp, lazy=True)
+        os.remove(fp)
+
+        with self.assertRaisesRegex(ValueError, 'modified or removed'):
+            archiver.data_dir
+
     def test_load_ignores_root_dotfiles(self):
         fp = os.path.join(self.temp_dir.name, 'archive.zip')
         self.archiver.save(fp)
@@ -157,6 +408,7 @@ class TestArchiver(unittest.TestCase, ArchiveTestingMixin):
                 '%s/provenance/metadata.yaml' % root_dir,
                 '%s/provenance/VERSION' % root_dir,
                 '%s/provenance/citations.bib' % root_dir,
+                '%s/provenance/index.json' % root_dir,
                 '%s/provenance/action/action.yaml' % root_dir
             }
 
@@ -205,6 +457,7 @@ class TestArchiver(unittest.TestCase, ArchiveTestingMixin):
             'provenance/metadata.yaml',
             'provenance/VERSION',
             'provenance/citations.bib',
+            'provenance/index.json',
             'provenance/action/action.yaml'
         }
 
@@ -229,6 +482,7 @@ class TestArchiver(unittest.TestCase, ArchiveTestingMixin):
             'provenance/metadata.yaml',
             'provenance/VERSION',
             'provenance/citations.bib',
+            'provenance/index.json',
             'provenance/action/action.yaml'
         }
 
@@ -292,6 +546,7 @@ class TestArchiver(unittest.TestCase, ArchiveTestingMixin):
                 '%s/provenance/metadata.yaml' % root_dir,
                 '%s/provenance/VERSION' % root_dir,
                 '%s/provenance/citations.bib' % root_dir,
+                '%s/provenance/index.json' % root_dir,
                 '%s/provenance/action/action.yaml' % root_dir,
                 '%s/VERSION' % second_root_dir
             }
@@ -365,6 +620,107 @@ class TestArchiver(unittest.TestCase, ArchiveTestingMixin):
                                             'f47bc36040d5c7db08e4b3a457dcfbb2')
                           })
 
+    def tamper(self, archiver):
+        with (archiver.root_dir / 'data' / 'ints.txt').open('w') as fh:
+            fh.write('999\n')
+        with (archiver.root_dir / 'metadata.yaml').open('a') as fh:
+            fh.write('# tampered\n')
+
+    def test_checksums_incremental(self):
+        with mock.patch('qiime2.core.util.md5sum',
+                        wraps=util.md5sum) as md5sum:
+            diff = self.archiver.validate_checksums(incremental=True)
+
+            self.assertEqual(diff, ({}, {}, {}))
+            # The checksums computed when the archive was written still hold
+            self.assertEqual(md5sum.call_count, 0)
+
+            self.tamper(self.archiver)
+            diff = self.archiver.validate_checksums(incremental=True)
+
+            self.assertEqual(set(diff.changed),
+                             {'data/ints.txt', 'metadata.yaml'})
+            self.assertEqual(md5sum.call_count, 2)
+
+    def test_checksums_incremental_loaded(self):
+        fp = os.path.join(self.temp_dir.name, 'archive.zip')
+        self.archiver.save(fp)
+        archiver = Archiver.load(fp)
+        n_files = len(archiver.get_checksums())
+
+        with mock.patch('qiime2.core.util.md5sum',
+                        wraps=util.md5sum) as md5sum:
+            diff = archiver.validate_checksums(incremental=True)
+            self.assertEqual(diff, ({}, {}, {}))
+            self.assertEqual(md5sum.call_count, n_files)
+
+            diff = archiver.validate_checksums(incremental=True)
+            self.assertEqual(diff, ({}, {}, {}))
+            self.assertEqual(md5sum.call_count, n_files)
+
+            # A full validation always reads everything
+            diff = archiver.validate_checksums()
+            self.assertEqual(diff, ({}, {}, {}))
+            self.assertEqual(md5sum.call_count, 2 * n_files)
+
+    def test_checksums_sample(self):
+        self.tamper(self.archiver)
+
+        with mock.patch('qiime2.core.util.md5sum',
+                        wraps=util.md5sum) as md5sum:
+            diff = self.archiver.validate_checksums(sample=1)
+
+            self.assertEqual(md5sum.call_count, 1)
+            self.assertLessEqual(len(diff.changed), 1)
+
+            diff = self.archiver.validate_checksums(sample=1000)
+
+            self.assertEqual(set(diff.changed),
+                             {'data/ints.txt', 'metadata.yaml'})
+
+    def test_checksums_sample_added_and_removed(self):
+        with (self.archiver.root_dir / 'tamper.txt').open('w') as fh:
+            fh.write('extra file')
+        (self.archiver.root_dir / 'VERSION').unlink()
+
+        diff = self.archiver.validate_checksums(sample=0)
+
+        self.assertEqual(diff.added,
+                         {'tamper.txt': '296583001b00d2b811b5871b19e0ad28'})
+        self.assertEqual(list(diff.removed), ['VERSION'])
+        self.assertEqual(diff.changed, {})
+
+    def test_checksums_parallel(self):
+        self.tamper(self.archiver)
+
+        diff = self.archiver.validate_checksums(workers=4)
+
+        self.assertEqual(diff.changed['data/ints.txt'],
+                         ('c0710d6b4f15dfa88f600b0e6b624077',
+                          'f47bc36040d5c7db08e4b3a457dcfbb2'))
+        self.assertEqual(set(diff.changed),
+                         {'data/ints.txt', 'metadata.yaml'})
+
+    def test_checksums_fail_fast(self):
+        self.tamper(self.archiver)
+
+        for workers in 1, 4:
+            diff = self.archiver.validate_checksums(workers=workers,
+                                                    fail_fast=True)
+
+            self.assertEqual(len(diff.changed), 1)
+            self.assertIn(list(diff.changed)[0],
+                          {'data/ints.txt', 'metadata.yaml'})
+
+        (self.archiver.root_dir / 'VERSION').unlink()
+        with mock.patch('qiime2.core.util.md5sum',
+                        wraps=util.md5sum) as md5sum:
+            diff = self.archiver.validate_checksums(fail_fast=True)
+
+            self.assertEqual(list(diff.removed), ['VERSION'])
+            self.assertEqual(diff.changed, {})
+            self.assertEqual(md5sum.call_count, 0)
+
     def test_checksum_backwards_compat(self):
         self.tearDown()
         with artifact_version(4):
@@ -0,0 +1,158 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2016-2020, QIIME 2 development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# ----------------------------------------------------------------------------
+
+import os
+import pathlib
+import stat
+import tempfile
+import unittest
+import zipfile
+
+import qiime2
+from qiime2.core.archive import Archiver
+from qiime2.core.archive import ImportProvenanceCapture
+from qiime2.core.archive.cache import ExtractionCache
+from qiime2.core.archive.format.util import artifact_version
+from qiime2.core.testing.format import IntSequenceDirectoryFormat
+from qiime2.core.testing.type import IntSequence1
+
+
+class TestExtractionCache(unittest.TestCase):
+    def setUp(self):
+        prefix = "qiime2-test-temp-"
+        self.temp_dir = tempfile.TemporaryDirectory(prefix=prefix)
+        self.cache_dir = pathlib.Path(self.temp_dir.name) / 'cache'
+        self.cache = ExtractionCache(self.cache_dir)
+        Archiver.EXTRACTION_CACHE = self.cache
+
+    def tearDown(self):
+        Archiver.EXTRACTION_CACHE = None
+        self.temp_dir.cleanup()
+
+    def make_archive(self, name, ints=(1, 2, 3)):
+        def data_initializer(data_dir):
+            with (data_dir / 'ints.txt').open('w') as fh:
+                for i in ints:
+                    fh.write('%d\n' % i)
+
+        archiver = Archiver.from_data(
+            IntSequence1, IntSequenceDirectoryFormat,
+            data_initializer=data_initializer,
+            provenance_capture=ImportProvenanceCapture())
+        fp = os.path.join(self.temp_dir.name, name)
+        archiver.save(fp)
+        return archiver, fp
+
+    def entries(self):
+        return {p.name for p in (self.cache_dir / 'entries').iterdir()}
+
+    def test_load_populates_and_reuses_entry(self):
+        original, fp = self.make_archive('archive.zip')
+
+        archiver = Archiver.load(fp)
+
+        key = self.cache.get_key(Archiver.get_archive(fp))
+        self.assertEqual(self.entries(), {key})
+        self.assertTrue(key.startswith(str(original.uuid)))
+        self.assertEqual((archiver.data_dir / 'ints.txt').read_text(),
+                         '1\n2\n3\n')
+        self.assertEqual(archiver.validate_checksums(), ({}, {}, {}))
+
+        cached = (self.cache_dir / 'entries' / key / str(original.uuid) /
+                  'data' / 'ints.txt')
+        self.assertEqual(cached.stat().st_mode & 0o222, 0)
+
+        second = Archiver.load(fp)
+        self.assertEqual(self.entries(), {key})
+        self.assertEqual((second.data_dir / 'ints.txt').stat().st_ino,
+                         cached.stat().st_ino)
+
+        # Cleaning up a loaded archive leaves the cache intact.
+        second._destructor()
+        self.assertEqual(cached.read_text(), '1\n2\n3\n')
+
+    def test_exported_data_is_writable(self):
+        _, fp = self.make_archive('archive.zip')
+        artifact = qiime2.Artifact.load(fp)
+        self.assertEqual(len(self.entries()), 1)
+
+        export_dir = pathlib.Path(self.temp_dir.name) / 'export'
+        artifact.export_data(str(export_dir))
+
+        exported = export_dir / 'ints.txt'
+        self.assertEqual(exported.read_text(), '1\n2\n3\n')
+        self.assertTrue(exported.stat().st_mode & stat.S_IWUSR)
+        self.assertFalse(
+            (artifact._archiver.data_dir / 'ints.txt').stat().st_mode &
+            stat.S_IWUSR)
+
+    def test_lazy_load_does_not_populate(self):
+        _, fp = self.make_archive('archive.zip')
+
+        archiver = Archiver.load(fp, lazy=True)
+
+        self.assertEqual(self.entries(), set())
+        self.assertFalse(archiver.is_mounted('data'))
+
+        Archiver.load(fp)
+        archiver = Archiver.load(fp, lazy=True)
+
+        self.assertTrue(archiver.is_mounted('data'))
+
+    def test_corrupt_archive_is_not_cached(self):
+        _, fp = self.make_archive('archive.zip')
+        bad_fp = os.path.join(self.temp_dir.name, 'bad.zip')
+        with zipfile.ZipFile(fp) as src, zipfile.ZipFile(bad_fp, 'w') as dst:
+            for name in src.namelist():
+                data = src.read(name)
+                if name.endswith('data/ints.txt'):
+                    data = b'4\n5\n6\n'
+                dst.writestr(name, data)
+
+        archiver = Archiver.load(bad_fp)
+
+        self.assertEqual(self.entries(), set())
+        self.assertEqual((archiver.data_dir / 'ints.txt').read_text(),
+                         '4\n5\n6\n')
+        self.assertEqual(list(archiver.validate_checksums().changed),
+                         ['data/ints.txt'])
+
+    def test_archive_without_checksums_is_not_cached(self):
+        with artifact_version(4):
+            _, fp = self.make_archive('archive.zip')
+
+        archiver = Archiver.load(fp)
+
+        self.assertEqual(self.entries(), set())
+        self.assertEqual((archiver.data_dir / 'ints.txt').read_text(),
+                         '1\n2\n3\n')
+
+    def test_evicts_least_recently_used(self):
+        _, fp1 = self.make_archive('archive1.zip')
+        _, fp2 = self.make_archive('archive2.zip', ints=(4, 5, 6))
+        key1 = self.cache.get_key(Archiver.get_archive(fp1))
+        key2 = self.cache.get_key(Archiver.get_archive(fp2))
+
+        Archiver.load(fp1)
+        size = int((self.cache_dir / 'entries' / key1 / 'SIZE').read_text())
+        self.cache.max_size = size
+
+        Archiver.load(fp2)
+
+        self.assertEqual(self.entries(), {key2})
+        self.assertEqual(list((self.cache_dir / 'staging').iterdir()), [])
+
+        archiver = Archiver.load(fp1)
+
+        self.assertEqual(self.entries(), {key1})
+        self.assertEqual((archiver.data_dir / 'ints.txt').read_text(),
+                         '1\n2\n3\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,19 +6,99 @@
 # The full license is in the file LICENSE, distributed with this software.
 # ----------------------------------------------------------------------------
 
+import collections
+import json
+import pathlib
 import unittest
 import re
 import unittest.mock as mock
 
 import pandas as pd
 import pandas.util.testing as pdt
+import yaml
 
 import qiime2
 from qiime2.plugins import dummy_plugin
-from qiime2.core.testing.type import IntSequence1, Mapping
+from qiime2.core.testing.type import IntSequence1, IntSequence2, Mapping
 import qiime2.core.archive.provenance as provenance
 
 
+class TestCaptureEnv(unittest.TestCase):
+    def setUp(self):
+        self.dists = [mock.Mock(project_name='a', version='1.0'),
+                      mock.Mock(project_name='b', version='2.0')]
+        self.working_set = mock.MagicMock(entries=['site-packages'],
+                                          by_key={'a': None, 'b': None})
+        self.working_set.__iter__.side_effect = lambda: iter(self.dists)
+
+    def test_cached(self):
+        with mock.patch('pkg_resources.working_set', self.working_set):
+            capture = provenance.ImportProvenanceCapture()
+            env = capture.capture_env()
+            env['mutated'] = None
+            self.assertEqual(
+                provenance.ImportProvenanceCapture().capture_env(),
+                collections.OrderedDict([('a', '1.0'), ('b', '2.0')]))
+            self.assertEqual(self.working_set.__iter__.call_count, 1)
+
+            self.dists.append(mock.Mock(project_name='c', version='3.0'))
+            self.working_set.by_key['c'] = None
+            self.assertEqual(
+                capture.capture_env(),
+                collections.OrderedDict([('a', '1.0'), ('b', '2.0'),
+                                         ('c', '3.0')]))
+            self.assertEqual(self.working_set.__iter__.call_count, 2)
+
+        self.assertNotEqual(provenance.ImportProvenanceCapture().capture_env(),
+                            env)
+
+
+class TestWriteActionYaml(unittest.TestCase):
+    def setUp(self):
+        self.written = []
+        original = provenance.ProvenanceCapture.write_action_yaml
+
+        def write_action_yaml(capture):
+            original(capture)
+            with (capture.action_dir / capture.ACTION_FILE).open() as fh:
+                self.written.append((fh.read(), self.reference(capture)))
+
+        patcher = mock.patch.object(provenance.ProvenanceCapture,
+                                    'write_action_yaml', write_action_yaml)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    # The pure-Python emitter with the globally registered representers.
+    def reference(self, capture):
+        settings = dict(Dumper=yaml.Dumper, default_flow_style=False,
+                        indent=4)
+        sections = [{'execution': capture.make_execution_section()},
+                    {'action': capture.make_action_section()}]
+        if capture.transformers:
+            sections.append(
+                {'transformers': capture.make_transformers_section()})
+        sections.append({'environment': capture.make_env_section()})
+        return '\n'.join(yaml.dump(s, **settings) for s in sections)
+
+    def test_matches_pure_python_dumper(self):
+        df = pd.DataFrame({'a': ['1', '2', '3']},
+                          index=pd.Index(['0', '1', '2'], name='feature ID'))
+        a = qiime2.Artifact.import_data('IntSequence1', [1, 2, 3])
+        b = qiime2.Artifact.import_data('IntSequence2', [4, 5])
+        mapping = qiime2.Artifact.import_data('Mapping', {'a': '42'})
+
+        dummy_plugin.actions.identity_with_metadata(a, qiime2.Metadata(df))
+        dummy_plugin.actions.variadic_input_method(
+            ints=[a, b], int_set={qiime2.Artifact.import_data('SingleInt', 7)},
+            nums={3, 1, 2})
+        dummy_plugin.actions.typical_pipeline(a, mapping, False)
+        dummy_plugin.actions.most_common_viz(a)
+
+        self.assertGreater(len(self.written), 4)
+        for observed, expected in self.written:
+            self.assertEqual(observed, expected)
+
+
 class TestProvenanceIntegration(unittest.TestCase):
     def test_chain_with_metadata(self):
         df = pd.DataFrame({'a': ['1', '2', '3']},
@@ -43,6 +123,103 @@ class TestProvenanceIntegration(unittest.TestCase):
                 fh.read(),
                 'feature ID\ta\n#q2:types\tcategorical\n0\t1\n1\t2\n2\t3\n')
 
+    def test_add_ancestor_links(self):
+        df = pd.DataFrame({'a': ['1', '2', '3']},
+                          index=pd.Index(['0', '1', '2'], name='feature ID'))
+        a = qiime2.Artifact.import_data('IntSequence1', [1, 2, 3])
+        b = dummy_plugin.actions.identity_with_metadata(
+            a, qiime2.Metadata(df)).out
+
+        capture = provenance.ImportProvenanceCapture()
+        self.assertEqual(capture.add_ancestor(b), str(b.uuid))
+
+        b_dir = b._archiver.provenance_dir
+        for relpath in 'action/action.yaml', 'metadata.yaml', 'VERSION':
+            self.assertEqual(
+                (capture.ancestor_dir / str(b.uuid) / relpath).stat().st_ino,
+                (b_dir / relpath).stat().st_ino)
+            self.assertEqual(
+                (capture.ancestor_dir / str(a.uuid) / relpath).stat().st_ino,
+                (b_dir / 'artifacts' / str(a.uuid) / relpath).stat().st_ino)
+        self.assertFalse(
+            (capture.ancestor_dir / str(b.uuid) / 'artifacts').exists())
+
+    def test_fork_links_ancestors(self):
+        a = qiime2.Artifact.import_data('IntSequence1', [1, 2, 3])
+        capture = provenance.ImportProvenanceCapture()
+        capture.add_ancestor(a)
+        with (capture.action_dir / 'metadata.tsv').open('w') as fh:
+            fh.write('id\n')
+
+        forked = capture.fork()
+
+        relpath = pathlib.Path(str(a.uuid)) / 'action' / 'action.yaml'
+        self.assertEqual((forked.ancestor_dir / relpath).stat().st_ino,
+                         (capture.ancestor_dir / relpath).stat().st_ino)
+
+        # So is recorded metadata, but the directories are the fork's own
+        forked_tsv = forked.action_dir / 'metadata.tsv'
+        original_tsv = capture.action_dir / 'metadata.tsv'
+        self.assertEqual(forked_tsv.stat().st_ino,
+                         original_tsv.stat().st_ino)
+        (forked.action_dir / 'other.tsv').write_text('id\n')
+        self.assertFalse((capture.action_dir / 'other.tsv').exists())
+
+    def test_metadata_written_once(self):
+        provenance._metadata_store.clear()
+        df = pd.DataFrame({'once': ['1', '2', '3']},
+                          index=pd.Index(['0', '1', '2'], name='id'))
+        ints = qiime2.Artifact.import_data(IntSequence1, [1, 2, 3])
+
+        with mock.patch.object(qiime2.Metadata, 'save',
+                               autospec=True,
+                               side_effect=qiime2.Metadata.save) as save:
+            b = dummy_plugin.actions.identity_with_metadata(
+                ints, qiime2.Metadata(df)).out
+            c = dummy_plugin.actions.identity_with_metadata(
+                b, qiime2.Metadata(df.copy())).out
+            df['once'] = ['4', '5', '6']
+            d = dummy_plugin.actions.identity_with_metadata(
+                c, qiime2.Metadata(df)).out
+
+        self.assertEqual(save.call_count, 2)
+        b_tsv = b._archiver.provenance_dir / 'action' / 'metadata.tsv'
+        c_tsv = c._archiver.provenance_dir / 'action' / 'metadata.tsv'
+        d_tsv = d._archiver.provenance_dir / 'action' / 'metadata.tsv'
+        self.assertEqual(b_tsv.read_text(), c_tsv.read_text())
+        self.assertEqual(d_tsv.read_text(),
+                         'id\tonce\n#q2:types\tcategorical\n'
+                         '0\t4\n1\t5\n2\t6\n')
+
+    def test_metadata_store_is_bounded(self):
+        provenance._metadata_store.clear()
+        ints = qiime2.Artifact.import_data(IntSequence1, [1, 2, 3])
+
+        def record(value):
+            df = pd.DataFrame({'col': [value]},
+                              index=pd.Index(['0'], name='id'))
+            return dummy_plugin.actions.identity_with_metadata(
+                ints, qiime2.Metadata(df)).out
+
+        with mock.patch.object(provenance._metadata_store, 'max_files', 1):
+            with mock.patch.object(qiime2.Metadata, 'save',
+                                   autospec=True,
+                                   side_effect=qiime2.Metadata.save) as save:
+                first = record('a')
+                record('b')
+                record('a')
+
+        self.assertEqual(save.call_count, 3)
+        self.assertEqual(len(list(provenance._metadata_store._dir.iterdir())),
+                         1)
+        # Evicting a table leaves the results which recorded it intact.
+        first_tsv = first._archiver.provenance_dir / 'action' / 'metadata.tsv'
+        self.assertIn('0\ta', first_tsv.read_text())
+
+        store_dir = provenance._metadata_store._dir
+        provenance._metadata_store.clear()
+        self.assertFalse(store_dir.exists())
+
     def test_chain_with_artifact_metadata(self):
         metadata_artifact_1 = qiime2.Artifact.import_data(
             'Mapping', {'a': 'foo', 'b': 'bar'})
@@ -148,6 +325,146 @@ class TestProvenanceIntegration(unittest.TestCase):
         self.assertTrue((p_dir / 'artifacts' / str(ints2.uuid) /
                          'action' / 'action.yaml').exists())
 
+    def test_index(self):
+        ints = qiime2.Artifact.import_data(IntSequence1, [0, 1, 2])
+        mapping = qiime2.Artifact.import_data(Mapping, {'a': '42'})
+
+        results = dummy_plugin.actions.typical_pipeline(ints, mapping, False)
+
+        index = json.loads(
+            (results.out_map._archiver.provenance_dir /
+             'index.json').read_text())
+        self.assertEqual(index['version'], 1)
+        self.assertEqual(index['root'], str(results.out_map.uuid))
+
+        nodes = index['nodes']
+        root = nodes[index['root']]
+        self.assertEqual(root['type'], 'Mapping')
+        self.assertEqual(root['action']['type'], 'pipeline')
+        self.assertEqual(root['action']['plugin'], 'dummy-plugin')
+        self.assertEqual(root['action']['action'], 'typical_pipeline')
+        self.assertEqual(root['action']['output-name'], 'out_map')
+        # The pipeline returned its input, so that is what it is an alias of.
+        self.assertEqual(root['action']['alias-of'], str(mapping.uuid))
+        self.assertEqual(root['parents'], [str(ints.uuid), str(mapping.uuid)])
+
+        self.assertEqual(nodes[str(ints.uuid)]['action']['type'], 'import')
+        self.assertEqual(nodes[str(ints.uuid)]['parents'], [])
+
+        # Every ancestor in the provenance is indexed.
+        ancestors = results.out_map._archiver.provenance_dir / 'artifacts'
+        self.assertEqual(set(nodes) - {index['root']},
+                         {p.name for p in ancestors.iterdir()})
+        # By the root's index alone.
+        self.assertEqual(list(ancestors.glob('*/index.json')), [])
+        for node in nodes.values():
+            self.assertIsNotNone(node['action'])
+            for parent in node['parents']:
+                self.assertIn(parent, nodes)
+
+    def test_index_parameters_digest(self):
+        ints = qiime2.Artifact.import_data(IntSequence1, [0, 1, 2])
+
+        a = dummy_plugin.actions.optional_artifacts_method(ints, 1).output
+        b = dummy_plugin.actions.optional_artifacts_method(ints, 1).output
+        c = dummy_plugin.actions.optional_artifacts_method(ints, 2).output
+
+        def digest(result):
+            index = json.loads(
+                (result._archiver.provenance_dir / 'index.json').read_text())
+            return index['nodes'][str(result.uuid)]['action'][
+                'parameters-digest']
+
+        self.assertEqual(digest(a), digest(b))
+        self.assertNotEqual(digest(a), digest(c))
+
+    def test_index_ancestor_without_index(self):
+        ints = qiime2.Artifact.import_data(IntSequence1, [0, 1, 2])
+        (ints._archiver.provenance_dir / 'index.json').unlink()
+
+        left, _ = dummy_plugin.actions.split_ints(ints)
+
+        index = json.loads(
+            (left._archiver.provenance_dir / 'index.json').read_text())
+        self.assertEqual(index['nodes'][str(ints.uuid)],
+                         {'type': 'IntSequence1',
+                          'format': 'IntSequenceDirectoryFormat',
+                          'action': None, 'parents': None})
+        self.assertEqual(index['nodes'][str(left.uuid)]['parents'],
+                         [str(ints.uuid)])
+
+    def test_max_depth(self):
+        ints = qiime2.Artifact.import_data(IntSequence1, [0, 1, 2])
+        chain = [ints]
+        with mock.patch.object(provenance.ProvenanceCapture, 'MAX_DEPTH', 2):
+            for _ in range(5):
+                chain.append(dummy_plugin.actions.split_ints(chain[-1]).left)
+        last = chain[-1]
+
+        ancestors = last._archiver.provenance_dir / 'artifacts'
+        self.assertEqual({p.name for p in ancestors.iterdir()},
+                         {str(chain[-2].uuid), str(chain[-3].uuid)})
+
+        index = json.loads(
+            (last._archiver.provenance_dir / 'index.json').read_text())
+        self.assertEqual(set(index['nodes']),
+                         {str(r.uuid) for r in chain[-4:]})
+        stub = index['nodes'][str(chain[-4].uuid)]
+        self.assertTrue(stub['pruned'])
+        self.assertIsNone(stub['action'])
+
+        prov = last.provenance
+        self.assertEqual([n.uuid for n in prov.ancestors()],
+                         [str(r.uuid) for r in reversed(chain[-4:-1])])
+        self.assertTrue(prov[chain[-4].uuid].pruned)
+        self.assertFalse(prov[chain[-3].uuid].pruned)
+        self.assertEqual(prov[chain[-4].uuid].type, 'IntSequence1')
+
+    def test_max_depth_revisits_pruned_ancestor(self):
+        # `x` is first reached through `a`, which is too far away to keep
+        # its parent, and then as a direct input, which isn't.
+        base = qiime2.Artifact.import_data(IntSequence1, [0, 1, 2])
+        x = dummy_plugin.actions.split_ints(base).left
+        a = dummy_plugin.actions.split_ints(x).left
+        ints2 = qiime2.Artifact.import_data(IntSequence2, [5])
+
+        with mock.patch.object(provenance.ProvenanceCapture, 'MAX_DEPTH', 2):
+            result = dummy_plugin.actions.concatenate_ints(
+                a, x, ints2, 7, 9).concatenated_ints
+
+        prov = result.provenance
+        self.assertFalse(prov[base.uuid].pruned)
+        self.assertEqual([n.uuid for n in prov[x.uuid].parents],
+                         [str(base.uuid)])
+
+    def test_max_depth_parent_order(self):
+        # `e` is too far from `a` to keep it, `b` isn't: `a` is kept whichever
+        # of them comes first.
+        a = qiime2.Artifact.import_data(IntSequence1, [0, 1, 2, 3, 4, 5])
+        ints2 = qiime2.Artifact.import_data(IntSequence2, [10])
+        with mock.patch.object(provenance.ProvenanceCapture, 'MAX_DEPTH', 2):
+            b = dummy_plugin.actions.split_ints(a).left
+            c = dummy_plugin.actions.split_ints(b).left
+            e = dummy_plugin.actions.split_ints(c).left
+
+            for ints1, ints3 in (e, b), (b, e):
+                result = dummy_plugin.actions.concatenate_ints(
+                    ints1, ints3, ints2, 7, 9).concatenated_ints
+
+                ancestors = result._archiver.provenance_dir / 'artifacts'
+                self.assertTrue((ancestors / str(a.uuid)).exists())
+                prov = result.provenance
+                self.assertFalse(prov[a.uuid].pruned)
+                self.assertIsNotNone(prov[a.uuid].action)
+
+    def test_max_depth_invalid(self):
+        ints = qiime2.Artifact.import_data(IntSequence1, [0, 1, 2])
+        for max_depth in 0, -1:
+            with mock.patch.object(provenance.ProvenanceCapture, 'MAX_DEPTH',
+                                   max_depth):
+                with self.assertRaisesRegex(ValueError, 'at least 1'):
+                    dummy_plugin.actions.split_ints(ints)
+
     def test_output_name_different(self):
         ints = qiime2.Artifact.import_data(IntSequence1, [0, 1, 2, 3])
 
@@ -0,0 +1,152 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2016-2020, QIIME 2 development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# ----------------------------------------------------------------------------
+
+import os
+import pathlib
+import shutil
+import stat
+import tempfile
+import time
+import uuid as _uuid
+
+
+class DiskCache:
+    """A size-bounded, on-disk cache of directories shared between processes.
+
+    Each entry is built in a staging directory and published by renaming it
+    into place, so no process ever sees a partial entry. Using an entry
+    touches it. When `max_size` (in bytes) is exceeded, the least recently
+    used entries are evicted, as are entries which haven't been used for
+    `max_age` seconds.
+
+    Parameters
+    ----------
+    path : str or pathlib.Path
+        Directory of the cache, created if it does not exist.
+    max_size : int, optional
+        Upper bound on the total size of the entries.
+    max_age : float, optional
+        Upper bound on the time since an entry was last used.
+
+    """
+    ENTRIES_DIR = 'entries'
+    STAGING_DIR = 'staging'
+    SIZE_FILE = 'SIZE'
+
+    def __init__(self, path, max_size=None, max_age=None):
+        self.path = pathlib.Path(path)
+        self.max_size = max_size
+        self.max_age = max_age
+
+        self._entries = self.path / self.ENTRIES_DIR
+        self._staging = self.path / self.STAGING_DIR
+        self._entries.mkdir(parents=True, exist_ok=True)
+        self._staging.mkdir(parents=True, exist_ok=True)
+
+    def _get_entry(self, key):
+        """Return the directory of the entry named `key` after touching it,
+        or None if there is no such entry.
+
+        An expired entry is removed instead. Callers must still expect the
+        entry to be evicted by another process while they use it.
+
+        """
+        entry = self._entries / key
+        try:
+            if self._is_expired(entry.stat().st_mtime):
+                # Out of the way of the entry which will replace it.
+                self._remove(entry)
+                return None
+            # Touching the entry is what keeps it from being evicted.
+            os.utime(str(entry))
+        except FileNotFoundError:
+            return None
+        return entry
+
+    def _publish(self, key, build):
+        """Build the entry named `key` and publish it.
+
+        `build` is called with an empty staging directory to fill and returns
+        the size of its contents in bytes, or None if they shouldn't be cached
+        after all.
+
+        Returns
+        -------
+        bool
+            Whether an entry named `key` was published.
+
+        """
+        staging = pathlib.Path(tempfile.mkdtemp(dir=str(self._staging)))
+        try:
+            size = build(staging)
+            if size is None:
+                return False
+            (staging / self.SIZE_FILE).write_text(str(size))
+
+            try:
+                staging.rename(self._entries / key)
+            except OSError:
+                # Another process published the same entry first, which is
+                # just as good.
+                pass
+        finally:
+            if staging.exists():
+                self._rmtree(staging)
+
+        self.evict(keep=key)
+        return True
+
+    def _is_expired(self, mtime):
+        return self.max_age is not None and time.time() - mtime > self.max_age
+
+    def evict(self, keep=None):
+        """Remove expired entries, then least recently used entries until the
+        cache fits.
+
+        The entry named `keep` is never removed for its size, even if it is
+        the least recently used one (e.g. because timestamps are too coarse
+        to tell).
+
+        """
+        if self.max_size is None and self.max_age is None:
+            return
+
+        entries = []
+        for entry in self._entries.iterdir():
+            try:
+                size = int((entry / self.SIZE_FILE).read_text())
+                entries.append((entry.stat().st_mtime, size, entry))
+            except (FileNotFoundError, ValueError):
+                continue
+
+        total = sum(size for _, size, _ in entries)
+        for mtime, size, entry in sorted(entries, key=lambda e: e[0]):
+            if not self._is_expired(mtime):
+                if self.max_size is None or total <= self.max_size:
+                    break
+                if entry.name == keep:
+                    continue
+            self._remove(entry)
+            total -= size
+
+    def _remove(self, entry):
+        # Move the entry out of the way first, so that no other process can
+        # start using it while it is half deleted.
+        trash = self._staging / ('evicted-%s' % _uuid.uuid4())
+        try:
+            entry.rename(trash)
+        except FileNotFoundError:
+            return
+        self._rmtree(trash)
+
+    def _rmtree(self, path):
+        # Entries may have been made read-only.
+        def onerror(func, path, exc_info):
+            os.chmod(path, stat.S_IWUSR | stat.S_IRUSR)
+            func(path)
+        shutil.rmtree(str(path), onerror=onerror)
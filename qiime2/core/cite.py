@@ -9,13 +9,76 @@
 import os
 import pkg_resources
 import collections
+import hashlib
+import json
+import tempfile
+import threading
 
 import bibtexparser as bp
 
 CitationRecord = collections.namedtuple('CitationRecord', ['type', 'fields'])
 
+# The citations most recently seen by this process, with their BibTeX (minus
+# the entry key) rendered the first time they are saved. The same handful of
+# records are cited by nearly every result, so they are shared rather than
+# duplicated and rendered again for each one. Only the `_MAX_RECORDS` most
+# recently used are kept.
+_MAX_RECORDS = 1024
+_records = collections.OrderedDict()
+_records_lock = threading.Lock()
+
+
+def _get_record_key(record):
+    return (record.type, tuple(sorted(record.fields.items())))
+
+
+def _get_record_entry(record):
+    key = _get_record_key(record)
+    with _records_lock:
+        entry = _records.get(key)
+        if entry is None:
+            entry = _records[key] = [record, None]
+            while len(_records) > _MAX_RECORDS:
+                _records.popitem(last=False)
+        else:
+            _records.move_to_end(key)
+        return entry
+
+
+def intern_citation(record):
+    """Return the shared CitationRecord equal to `record`."""
+    return _get_record_entry(record)[0]
+
+
+def _render_citation(key, record):
+    entry = _get_record_entry(record)
+    body = entry[1]
+    if body is None:
+        fields = record.fields.copy()
+        fields['ID'] = ''
+        fields['ENTRYTYPE'] = record.type
+        db = bp.bibdatabase.BibDatabase()
+        db.entries = [fields]
+        body = bp.dumps(db, bp.bwriter.BibTexWriter())
+        body = body[len('@%s{' % record.type):]
+        entry[1] = body
+    return '@%s{%s%s' % (record.type, key, body)
+
 
 class Citations(collections.OrderedDict):
+    # A directory in which parsed BibTeX files are kept (as JSON) between
+    # processes, so that loading a plugin's citations is only slow the first
+    # time. Entries are keyed by the file's path and are ignored once its
+    # size or modification time change. None disables the on-disk cache,
+    # files are still only parsed once per process.
+    CACHE_DIR = None
+    # How many parsed files are kept in memory, most recently loaded first.
+    MAX_PARSED = 64
+
+    # The parsed entries of each file and the key they were parsed for.
+    _parsed = collections.OrderedDict()
+    _parsed_lock = threading.Lock()
+
     @classmethod
     def load(cls, path, package=None):
         if package is not None:
@@ -23,6 +86,30 @@ class Citations(collections.OrderedDict):
             root = os.path.abspath(root)
             path = os.path.join(root, path)
 
+        stat = os.stat(path)
+        key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+        with cls._parsed_lock:
+            parsed_key, entries = cls._parsed.get(key[0], (None, None))
+            if parsed_key == key:
+                cls._parsed.move_to_end(key[0])
+            else:
+                entries = None
+        if entries is None:
+            entries = cls._load_cached(key)
+            if entries is None:
+                entries = cls._parse(path)
+                cls._save_cached(key, entries)
+            with cls._parsed_lock:
+                # A changed file replaces what was parsed from it before.
+                cls._parsed[key[0]] = (key, entries)
+                cls._parsed.move_to_end(key[0])
+                while len(cls._parsed) > cls.MAX_PARSED:
+                    cls._parsed.popitem(last=False)
+
+        return cls(entries)
+
+    @classmethod
+    def _parse(cls, path):
         parser = bp.bparser.BibTexParser()
         # Downstream tooling is much easier with unicode. For actual latex
         # users, use the modern biber backend instead of bibtex
@@ -41,34 +128,86 @@ class Citations(collections.OrderedDict):
             if id_ in entries:
                 raise ValueError("Duplicate entry-key found in BibTex file: %r"
                                  % id_)
-            entries[id_] = CitationRecord(type_, entry)
+            entries[id_] = intern_citation(CitationRecord(type_, entry))
 
-        return cls(entries)
+        return entries
 
-    def __iter__(self):
-        return iter(self.values())
+    @classmethod
+    def _get_cache_path(cls, key):
+        digest = hashlib.md5(key[0].encode('utf-8')).hexdigest()
+        return os.path.join(cls.CACHE_DIR, digest + '.json')
 
-    def save(self, f):
-        entries = []
-        for key, citation in self.items():
-            entry = citation.fields.copy()
-            entry['ID'] = key
-            entry['ENTRYTYPE'] = citation.type
+    @classmethod
+    def _load_cached(cls, key):
+        if cls.CACHE_DIR is None:
+            return None
+        try:
+            with open(cls._get_cache_path(key)) as fh:
+                cached = json.load(fh)
+        except (OSError, ValueError):
+            return None
+        if not cls._is_valid_cache(cached, key):
+            return None
 
-            entries.append(entry)
+        entries = collections.OrderedDict()
+        for id_, type_, fields in cached['entries']:
+            entries[id_] = intern_citation(CitationRecord(type_, fields))
+        return entries
 
-        db = bp.bibdatabase.BibDatabase()
-        db.entries = entries
+    @staticmethod
+    def _is_valid_cache(cached, key):
+        # Anything other than what `_save_cached` wrote for `key` (e.g. a file
+        # written by another release, or damaged) is parsed again instead.
+        try:
+            return cached['key'] == list(key) and all(
+                isinstance(id_, str) and isinstance(type_, str) and
+                isinstance(fields, dict) and
+                all(isinstance(k, str) and isinstance(v, str)
+                    for k, v in fields.items())
+                for id_, type_, fields in cached['entries'])
+        except (KeyError, TypeError, ValueError):
+            return False
 
-        writer = bp.bwriter.BibTexWriter()
-        writer.order_entries_by = tuple(self.keys())
+    @classmethod
+    def _save_cached(cls, key, entries):
+        if cls.CACHE_DIR is None:
+            return
+        cached = {'key': list(key),
+                  'entries': [[id_, record.type, record.fields]
+                              for id_, record in entries.items()]}
+        try:
+            os.makedirs(cls.CACHE_DIR, exist_ok=True)
+            # Written under a temporary name first, so that concurrent
+            # processes never see a partial file.
+            fd, tmp = tempfile.mkstemp(dir=cls.CACHE_DIR, suffix='.tmp')
+        except OSError:
+            # The cache is only an optimization.
+            return
+        try:
+            with os.fdopen(fd, 'w') as fh:
+                json.dump(cached, fh)
+            os.replace(tmp, cls._get_cache_path(key))
+        except OSError:
+            os.unlink(tmp)
+
+    def __iter__(self):
+        return iter(self.values())
+
+    def save(self, f):
+        # Same as writing every entry with bibtexparser's BibTexWriter, in
+        # the order they were added, but each record is only rendered once.
+        # Older releases of bibtexparser end each entry with a blank line
+        # instead of separating them.
+        separator = getattr(bp.bwriter.BibTexWriter(), 'entry_separator', '')
+        bibtex = separator.join(_render_citation(key, citation)
+                                for key, citation in self.items())
 
         owned = False
         if type(f) is str:
             f = open(f, 'w')
             owned = True
         try:
-            bp.dump(db, f, writer=writer)
+            f.write(bibtex)
         finally:
             if owned:
                 f.close()
@@ -20,14 +20,24 @@ class FormatBase:
                 raise ValueError("A path must be omitted when writing.")
 
         if mode == 'w':
-            self.path = qpath.OutPath(
+            self._path = qpath.OutPath(
                 # TODO: parents shouldn't know about their children
                 dir=isinstance(self, model.DirectoryFormat),
                 prefix='q2-%s-' % self.__class__.__name__)
         else:
-            self.path = qpath.InPath(path)
+            self._path = qpath.InPath(path)
 
         self._mode = mode
 
+    @property
+    def path(self):
+        # A format backed by a lazily loaded archive can only resolve its
+        # members on demand through its fields, anything which uses the path
+        # directly needs every member to be present.
+        members = getattr(self._path, '_members', None)
+        if members is not None:
+            members.mount()
+        return self._path
+
     def __str__(self):
         return str(self.path)
@@ -27,8 +27,11 @@ class OwnedPath(_ConcretePath):
         self._user_owned = True
         return self
 
-    def _move_or_copy(self, other):
+    def _move_or_copy(self, other, ledger=None):
         if self._user_owned:
+            if ledger is not None:
+                # Hashes the copies for the archive's checksums on the way
+                return ledger.copy(self, other)
             if self.is_dir():
                 return distutils.dir_util.copy_tree(str(self), str(other))
             else:
@@ -43,6 +46,9 @@ class InPath(OwnedPath):
         self.__backing_path = path
         if hasattr(path, '_user_owned'):
             self._user_owned = path._user_owned
+        # Members of a lazily loaded archive which back this path, they are
+        # mounted on demand (see `qiime2.core.archive.Archiver.lazy_data_dir`)
+        self._members = getattr(path, '_members', None)
         return self
 
     chmod = lchmod = rename = replace = rmdir = symlink_to = touch = unlink = \
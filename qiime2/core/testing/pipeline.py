@@ -80,6 +80,29 @@ def pipelines_in_pipeline(ctx, int_sequence, mapping):
     return tuple(results)
 
 
+def parallel_pipeline(ctx, ints1, ints2):
+    split_ints = ctx.get_action('dummy_plugin', 'split_ints')
+
+    # Only meant to be run as `parallel_pipeline.parallel`, which makes these
+    # futures.
+    futures = [split_ints(ints1), split_ints(ints2)]
+
+    return tuple(future.result().left for future in futures)
+
+
+def lazy_pipeline(ctx, int_sequence):
+    split_ints = ctx.get_action('dummy_plugin', 'split_ints')
+    most_common_viz = ctx.get_action('dummy_plugin', 'most_common_viz')
+
+    # Works the same way whether or not these are proxies (see
+    # `lazy_pipeline.lazy`).
+    left, right = split_ints(int_sequence)
+    left_viz, = most_common_viz(left)
+    right_viz, = most_common_viz(right)
+
+    return left_viz, right_viz
+
+
 def pointless_pipeline(ctx):
     # Use a real type expression instead of a string.
     return ctx.make_artifact(SingleInt, 4)
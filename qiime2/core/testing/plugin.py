@@ -45,7 +45,7 @@ from .visualizer import (most_common_viz, mapping_viz, params_only_viz,
 from .pipeline import (parameter_only_pipeline, typical_pipeline,
                        optional_artifact_pipeline, visualizer_only_pipeline,
                        pipelines_in_pipeline, pointless_pipeline,
-                       failing_pipeline)
+                       failing_pipeline, parallel_pipeline, lazy_pipeline)
 from ..cite import Citations
 
 citations = Citations.load('citations.bib', package='qiime2.core.testing')
@@ -611,6 +611,35 @@ dummy_plugin.pipelines.register_function(
                  'visualizer_only_pipeline')
 )
 
+dummy_plugin.pipelines.register_function(
+    function=parallel_pipeline,
+    inputs={
+        'ints1': IntSequence1,
+        'ints2': IntSequence1
+    },
+    parameters={},
+    outputs=[
+        ('left1', IntSequence1),
+        ('left2', IntSequence1)
+    ],
+    name='Split two sequences at once',
+    description='Splits both sequences concurrently, see `Pipeline.parallel`'
+)
+
+dummy_plugin.pipelines.register_function(
+    function=lazy_pipeline,
+    inputs={
+        'int_sequence': IntSequence1
+    },
+    parameters={},
+    outputs=[
+        ('left_viz', Visualization),
+        ('right_viz', Visualization)
+    ],
+    name='Visualize both halves of a sequence',
+    description='Visualizes the halves concurrently, see `Pipeline.lazy`'
+)
+
 dummy_plugin.pipelines.register_function(
     function=pointless_pipeline,
     inputs={},
@@ -0,0 +1,251 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2016-2020, QIIME 2 development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# ----------------------------------------------------------------------------
+
+import collections
+import io
+import json
+import os
+import pathlib
+import tempfile
+import unittest
+import unittest.mock as mock
+
+import bibtexparser as bp
+
+import qiime2
+from qiime2.core.cite import Citations, CitationRecord, intern_citation
+
+
+class TestCitations(unittest.TestCase):
+    def setUp(self):
+        self.citations = Citations()
+        self.citations['b|first|0'] = CitationRecord(
+            'article', {'author': 'Doe, Jane', 'title': 'Unicode: ƒoo',
+                        'year': '2020'})
+        self.citations['a|second|0'] = qiime2.__citations__[0]
+        self.citations['c|third|0'] = CitationRecord(
+            'misc', {'title': 'Cited {twice}'})
+        self.citations['c|third|1'] = CitationRecord(
+            'misc', {'title': 'Cited {twice}'})
+
+    # What `save` used to do.
+    def reference(self, citations):
+        entries = []
+        for key, citation in citations.items():
+            entry = citation.fields.copy()
+            entry['ID'] = key
+            entry['ENTRYTYPE'] = citation.type
+            entries.append(entry)
+        db = bp.bibdatabase.BibDatabase()
+        db.entries = entries
+        writer = bp.bwriter.BibTexWriter()
+        writer.order_entries_by = tuple(citations.keys())
+        return bp.dumps(db, writer)
+
+    def test_save_matches_bibtexparser(self):
+        fh = io.StringIO()
+        self.citations.save(fh)
+
+        self.assertEqual(fh.getvalue(), self.reference(self.citations))
+
+    def test_save_renders_each_record_once(self):
+        record = CitationRecord('misc', {'title': 'Rendered once'})
+        citations = Citations([('a|0', record), ('b|0', record)])
+
+        with mock.patch('bibtexparser.dumps', wraps=bp.dumps) as dumps:
+            citations.save(io.StringIO())
+            citations.save(io.StringIO())
+
+        self.assertEqual(dumps.call_count, 1)
+        fh = io.StringIO()
+        citations.save(fh)
+        self.assertEqual(fh.getvalue(), self.reference(citations))
+
+    def test_save_roundtrip(self):
+        fh = io.StringIO()
+        self.citations.save(fh)
+
+        loaded = bp.loads(fh.getvalue())
+
+        self.assertEqual([e['ID'] for e in loaded.entries],
+                         list(self.citations.keys()))
+
+    def test_intern_citation(self):
+        a = CitationRecord('misc', {'title': 'Interned', 'year': '2020'})
+        b = CitationRecord('misc', {'year': '2020', 'title': 'Interned'})
+        c = CitationRecord('misc', {'title': 'Interned', 'year': '2021'})
+
+        self.assertIs(intern_citation(a), a)
+        self.assertIs(intern_citation(b), a)
+        self.assertIs(intern_citation(c), c)
+
+    def test_intern_citation_is_bounded(self):
+        a = CitationRecord('misc', {'title': 'Bounded', 'year': '2020'})
+        b = CitationRecord('misc', {'title': 'Bounded', 'year': '2021'})
+        c = CitationRecord('misc', {'title': 'Bounded', 'year': '2022'})
+
+        with mock.patch('qiime2.core.cite._MAX_RECORDS', 2):
+            intern_citation(a)
+            intern_citation(b)
+            intern_citation(a)
+            intern_citation(c)
+
+            self.assertIs(intern_citation(a._replace(fields=a.fields.copy())),
+                          a)
+            b_copy = b._replace(fields=b.fields.copy())
+            self.assertIs(intern_citation(b_copy), b_copy)
+
+    def test_load_interns(self):
+        first = Citations.load('citations.bib', package='qiime2')
+        second = Citations.load('citations.bib', package='qiime2')
+
+        for a, b in zip(first, second):
+            self.assertIs(a, b)
+
+
+class TestCitationsLoad(unittest.TestCase):
+    BIB = """@article{key1,
+ author = {Doe, Jane},
+ title = {{\\'E}tude},
+ year = {2020}
+}
+
+@misc{key2,
+ title = {Other}
+}
+"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory(
+            prefix='qiime2-test-temp-')
+        root = pathlib.Path(self.temp_dir.name)
+        self.bib = root / 'citations.bib'
+        self.bib.write_text(self.BIB)
+        self.cache_dir = root / 'cache'
+
+        patcher = mock.patch.multiple(Citations, CACHE_DIR=str(self.cache_dir),
+                                      MAX_PARSED=Citations.MAX_PARSED,
+                                      _parsed=collections.OrderedDict())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def load(self):
+        with mock.patch.object(Citations, '_parse',
+                               wraps=Citations._parse) as parse:
+            citations = Citations.load(str(self.bib))
+        return citations, parse.call_count
+
+    def test_load(self):
+        citations, parsed = self.load()
+
+        self.assertEqual(parsed, 1)
+        self.assertEqual(list(citations.keys()), ['key1', 'key2'])
+        self.assertEqual(citations['key1'],
+                         CitationRecord('article', {'author': 'Doe, Jane',
+                                                    'title': 'Étude',
+                                                    'year': '2020'}))
+
+    def test_parsed_once_per_process(self):
+        first, _ = self.load()
+        first['key3'] = CitationRecord('misc', {})
+
+        second, parsed = self.load()
+
+        self.assertEqual(parsed, 0)
+        self.assertEqual(list(second.keys()), ['key1', 'key2'])
+
+    def test_parsed_once_across_processes(self):
+        first, _ = self.load()
+        Citations._parsed.clear()
+
+        second, parsed = self.load()
+
+        self.assertEqual(parsed, 0)
+        self.assertEqual(second, first)
+
+    def test_changed_file_is_parsed_again(self):
+        self.load()
+        self.bib.write_text(self.BIB.replace('Other', 'Changed'))
+        os.utime(str(self.bib), ns=(0, 0))
+        Citations._parsed.clear()
+
+        citations, parsed = self.load()
+
+        self.assertEqual(parsed, 1)
+        self.assertEqual(citations['key2'].fields['title'], 'Changed')
+
+    def test_parsed_files_are_bounded(self):
+        other = self.bib.with_name('other.bib')
+        other.write_text(self.BIB)
+        Citations.CACHE_DIR = None
+        Citations.MAX_PARSED = 1
+        self.load()
+
+        with mock.patch.object(Citations, '_parse',
+                               wraps=Citations._parse) as parse:
+            Citations.load(str(other))
+            Citations.load(str(other))
+        self.assertEqual(parse.call_count, 1)
+        self.assertEqual(len(Citations._parsed), 1)
+
+        _, parsed = self.load()
+        self.assertEqual(parsed, 1)
+
+    def test_corrupt_cache_is_ignored(self):
+        self.load()
+        for fp in self.cache_dir.iterdir():
+            fp.write_text('{"key": ')
+        Citations._parsed.clear()
+
+        citations, parsed = self.load()
+
+        self.assertEqual(parsed, 1)
+        self.assertEqual(list(citations.keys()), ['key1', 'key2'])
+
+    def test_malformed_cache_is_ignored(self):
+        self.load()
+        fp, = self.cache_dir.iterdir()
+        cached = json.loads(fp.read_text())
+        malformed = [
+            [],
+            {'entries': cached['entries']},
+            {'key': cached['key']},
+            {'key': cached['key'], 'entries': 42},
+            {'key': cached['key'], 'entries': [['key1', 'article']]},
+            {'key': cached['key'], 'entries': [['key1', 'article', []]]},
+            {'key': cached['key'], 'entries': [[1, 'misc', {'a': ['b']}]]},
+        ]
+        for cache in malformed:
+            fp.write_text(json.dumps(cache))
+            Citations._parsed.clear()
+
+            citations, parsed = self.load()
+
+            self.assertEqual(parsed, 1)
+            self.assertEqual(list(citations.keys()), ['key1', 'key2'])
+
+    def test_without_cache_dir(self):
+        Citations.CACHE_DIR = None
+
+        self.load()
+
+        self.assertFalse(self.cache_dir.exists())
+
+    def test_duplicate_key_is_not_cached(self):
+        self.bib.write_text(self.BIB.replace('key2', 'key1'))
+
+        for _ in range(2):
+            with self.assertRaisesRegex(ValueError, 'Duplicate'):
+                Citations.load(str(self.bib))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,7 +6,9 @@
 # The full license is in the file LICENSE, distributed with this software.
 # ----------------------------------------------------------------------------
 
+import os
 import unittest
+import unittest.mock as mock
 import tempfile
 import pathlib
 import collections
@@ -253,6 +255,125 @@ class TestMD5SumDirectory(unittest.TestCase):
                 ('bar/foo.baz', 'dcc0975b66728be0315abae5968379cb')
             ]))
 
+    def test_workers(self):
+        for name in 'beta', 'alpha':
+            (self.test_path / name).mkdir()
+            for i in range(20):
+                self.make_file(str(i).encode() * (i * 10000),
+                               '%s/%d' % (name, i))
+        self.make_file(b'z', 'z')
+
+        exp = util.md5sum_directory(self.test_path, workers=1)
+
+        self.assertEqual(len(exp), 41)
+        self.assertEqual(exp['alpha/2'], util.md5sum(self.test_path /
+                                                     'alpha' / '2'))
+        for workers in 2, 8, 100, None:
+            obs = util.md5sum_directory(self.test_path, workers=workers)
+            self.assertEqual(list(obs.items()), list(exp.items()))
+
+
+class TestChecksumLedger(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.TemporaryDirectory(prefix='qiime2-test-temp-')
+        self.test_path = pathlib.Path(self.test_dir.name)
+        self.ledger = util.ChecksumLedger()
+
+    def tearDown(self):
+        self.test_dir.cleanup()
+
+    def make_file(self, bytes_, relpath):
+        path = self.test_path / relpath
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open(mode='wb') as fh:
+            fh.write(bytes_)
+
+        return path
+
+    def hashed(self, md5sum):
+        return [pathlib.Path(c[0][0]).name for c in md5sum.call_args_list]
+
+    def test_md5sum(self):
+        path = self.make_file(b'Normal text\nand things\n', 'foo.txt')
+
+        with mock.patch('qiime2.core.util.md5sum',
+                        wraps=util.md5sum) as md5sum:
+            self.assertEqual(self.ledger.md5sum(path),
+                             '93b048d0202e4b06b658f3aef1e764d3')
+            moved = self.test_path / 'bar.txt'
+            path.rename(moved)
+            self.assertEqual(self.ledger.md5sum(moved),
+                             '93b048d0202e4b06b658f3aef1e764d3')
+            self.assertEqual(self.hashed(md5sum), ['foo.txt'])
+
+            with moved.open('ab') as fh:
+                fh.write(b'more')
+            self.assertEqual(self.ledger.md5sum(moved),
+                             util.md5sum(moved))
+            self.assertEqual(self.hashed(md5sum),
+                             ['foo.txt', 'bar.txt', 'bar.txt'])
+
+    def test_record(self):
+        path = self.make_file(b'a', 'a.txt')
+
+        self.ledger.record(path, 'not-really-an-md5')
+        self.ledger.record(self.test_path / 'missing.txt', 'missing')
+
+        self.assertEqual(self.ledger.md5sum(path), 'not-really-an-md5')
+        path.write_bytes(b'b')
+        self.assertEqual(self.ledger.md5sum(path),
+                         '92eb5ffee6ae2fec3ad71c777531578f')
+
+    def test_copy_directory(self):
+        src = self.test_path / 'src'
+        self.make_file(b'a', 'src/a.txt')
+        self.make_file(b'b' * 3000000, 'src/nested/b.txt')
+        self.make_file(b'', 'src/.hidden')
+        (src / 'c.txt').symlink_to(src / 'a.txt')
+        os.chmod(str(src / 'a.txt'), 0o640)
+        dst = self.test_path / 'dst'
+        self.make_file(b'existing', 'dst/existing.txt')
+        exp = collections.OrderedDict([
+            ('a.txt', '0cc175b9c0f1b6a831c399e269772661'),
+            ('c.txt', '0cc175b9c0f1b6a831c399e269772661'),
+            ('existing.txt', util.md5sum(dst / 'existing.txt')),
+            ('nested/b.txt', util.md5sum(src / 'nested' / 'b.txt')),
+        ])
+
+        with mock.patch('qiime2.core.util.md5sum',
+                        wraps=util.md5sum) as md5sum:
+            outputs = self.ledger.copy(src, dst)
+
+            self.assertEqual(
+                sorted(outputs),
+                [str(dst / name) for name in
+                 ['.hidden', 'a.txt', 'c.txt', 'nested/b.txt']])
+            self.assertEqual(
+                util.md5sum_directory(dst, ledger=self.ledger), exp)
+            # Only the file which wasn't copied is read again
+            self.assertEqual(self.hashed(md5sum), ['existing.txt'])
+
+        self.assertFalse((dst / 'c.txt').is_symlink())
+        self.assertEqual((dst / 'a.txt').stat().st_mode & 0o777, 0o640)
+        self.assertEqual((dst / 'a.txt').stat().st_mtime_ns,
+                         (src / 'a.txt').stat().st_mtime_ns)
+
+    def test_copy_file(self):
+        src = self.make_file(b'a', 'a.txt')
+        dst = self.test_path / 'dst'
+        dst.mkdir()
+
+        self.assertEqual(self.ledger.copy(src, dst), str(dst / 'a.txt'))
+        self.assertEqual(self.ledger.copy(src, dst / 'b.txt'),
+                         str(dst / 'b.txt'))
+
+        with mock.patch('qiime2.core.util.md5sum',
+                        wraps=util.md5sum) as md5sum:
+            for name in 'a.txt', 'b.txt':
+                self.assertEqual(self.ledger.md5sum(dst / name),
+                                 '0cc175b9c0f1b6a831c399e269772661')
+            self.assertEqual(self.hashed(md5sum), [])
+
 
 class TestChecksumFormat(unittest.TestCase):
     def test_to_simple(self):
@@ -131,7 +131,7 @@ class FormatType(ModelType):
         if isinstance(view, self._view_type):
             # wrap original path (inheriting the lifetime) and return a
             # read-only instance
-            return self._view_type(view.path, mode='r')
+            return self._view_type(view._path, mode='r')
 
         return view
 
@@ -143,7 +143,7 @@ class FormatType(ModelType):
         view.validate(level)
 
     def set_user_owned(self, view, value):
-        view.path._user_owned = value
+        view._path._user_owned = value
 
 
 class SingleFileDirectoryFormatType(FormatType):
@@ -6,11 +6,12 @@
 # The full license is in the file LICENSE, distributed with this software.
 # ----------------------------------------------------------------------------
 
+import concurrent.futures
 import contextlib
 import warnings
 import hashlib
 import os
-import io
+import shutil
 import collections
 
 import decorator
@@ -105,17 +106,113 @@ def duration_time(relative_delta):
         return '0 %s' % attrs[-1]
 
 
+# hashlib releases the GIL while digesting large buffers, so big reads keep
+# most of the hashing off the interpreter (and let threads run in parallel).
+_MD5SUM_CHUNK_SIZE = 1024 * 1024
+
+
 def md5sum(filepath):
     md5 = hashlib.md5()
     with open(str(filepath), mode='rb') as fh:
-        for chunk in iter(lambda: fh.read(io.DEFAULT_BUFFER_SIZE), b""):
+        for chunk in iter(lambda: fh.read(_MD5SUM_CHUNK_SIZE), b""):
             md5.update(chunk)
     return md5.hexdigest()
 
 
-def md5sum_directory(directory):
+class ChecksumLedger:
+    """Remembers the MD5 of files so unchanged content isn't hashed twice.
+
+    Checksums are keyed by a file's device, inode, size and modification time,
+    so a file which was moved or hardlinked keeps its entry while a file which
+    was rewritten does not. Files copied with `copy` are hashed as they are
+    copied.
+
+    """
+    def __init__(self):
+        self._checksums = {}
+
+    def _get_key(self, filepath):
+        try:
+            stat = os.stat(str(filepath))
+        except FileNotFoundError:
+            return None
+        return stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    def record(self, filepath, checksum):
+        """Record `checksum` as the MD5 of `filepath` as it is now."""
+        key = self._get_key(filepath)
+        if key is not None:
+            self._checksums[key] = checksum
+
+    def md5sum(self, filepath, cached=True):
+        """Return the MD5 of `filepath`, reading it only when necessary.
+
+        With `cached` False the file is always read and the entry refreshed.
+
+        """
+        key = self._get_key(filepath)
+        if cached and key in self._checksums:
+            return self._checksums[key]
+        checksum = md5sum(filepath)
+        self._checksums[key] = checksum
+        return checksum
+
+    def copy(self, src, dst):
+        """Copy the file or directory `src` to `dst`, hashing on the way.
+
+        A file is copied like `shutil.copy` and a directory is merged into
+        `dst` like `distutils.dir_util.copy_tree`, preserving modes and times.
+
+        """
+        src, dst = str(src), str(dst)
+        if not os.path.isdir(src):
+            if os.path.isdir(dst):
+                dst = os.path.join(dst, os.path.basename(src))
+            self._copy_file(src, dst, shutil.copymode)
+            return dst
+
+        outputs = []
+        for root, _, files in os.walk(src, followlinks=True):
+            dst_root = os.path.normpath(
+                os.path.join(dst, os.path.relpath(root, src)))
+            os.makedirs(dst_root, exist_ok=True)
+            for file in files:
+                outputs.append(os.path.join(dst_root, file))
+                self._copy_file(os.path.join(root, file), outputs[-1],
+                                shutil.copystat)
+        return outputs
+
+    def _copy_file(self, src, dst, copy_meta):
+        md5 = hashlib.md5()
+        with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+            for chunk in iter(lambda: fsrc.read(_MD5SUM_CHUNK_SIZE), b""):
+                md5.update(chunk)
+                fdst.write(chunk)
+        copy_meta(src, dst)
+        self.record(dst, md5.hexdigest())
+
+
+def link_or_copy(src, dst):
+    """Hardlink `src` to `dst`, or copy it when that isn't possible.
+
+    Suitable as the `copy_function` of `shutil.copytree`.
+
+    """
+    try:
+        os.link(str(src), str(dst))
+    except OSError:
+        shutil.copy2(str(src), str(dst))
+    return dst
+
+
+def find_files(directory):
+    """Map relative to absolute paths of non-hidden files below `directory`.
+
+    The result is ordered by a sorted, top-down walk of the directory.
+
+    """
     directory = str(directory)
-    sums = collections.OrderedDict()
+    paths = collections.OrderedDict()
     for root, dirs, files in os.walk(directory, topdown=True):
         dirs[:] = sorted([d for d in dirs if not d[0] == '.'])
         for file in sorted(files):
@@ -123,8 +220,33 @@ def md5sum_directory(directory):
                 continue
 
             path = os.path.join(root, file)
-            sums[os.path.relpath(path, start=directory)] = md5sum(path)
-    return sums
+            paths[os.path.relpath(path, start=directory)] = path
+    return paths
+
+
+def md5sum_directory(directory, workers=None, ledger=None):
+    """Checksum every non-hidden file below `directory`.
+
+    Files are hashed on a pool of `workers` threads (one per CPU when None).
+    The result is ordered by a sorted, top-down walk of the directory
+    regardless of the number of workers. Checksums already recorded in
+    `ledger`, a `ChecksumLedger`, are reused.
+
+    """
+    paths = find_files(directory)
+
+    md5 = md5sum if ledger is None else ledger.md5sum
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(paths))
+
+    if workers <= 1:
+        sums = map(md5, paths.values())
+        return collections.OrderedDict(zip(paths, sums))
+
+    with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+        sums = executor.map(md5, paths.values())
+        return collections.OrderedDict(zip(paths, sums))
 
 
 def to_checksum_format(filepath, checksum):
@@ -88,9 +88,11 @@ class BoundFile:
 
     def _validate_members(self, collected_paths, level):
         found_members = False
-        root = pathlib.Path(self._directory_format.path)
+        root = pathlib.Path(self._directory_format._path)
+        members = self._directory_format._lazy_members()
         for path in collected_paths:
-            if re.match(self.pathspec, str(path.relative_to(root))):
+            relpath = path.relative_to(root)
+            if re.match(self.pathspec, str(relpath)):
                 if collected_paths[path]:
                     # Not a ValidationError, this just shouldn't happen.
                     raise ValueError("%r was already validated by another"
@@ -98,23 +100,38 @@ class BoundFile:
                                      " overlap." % path)
                 collected_paths[path] = True
                 found_members = True
-                self.format(path, mode='r').validate(level)
+                validate = self._make_validator(path, level)
+                if members is not None and level == 'min':
+                    # Minimal validation of an unmounted member can wait
+                    # until something actually needs to read it.
+                    members.defer(relpath, validate)
+                else:
+                    validate()
         if not found_members:
             raise ValidationError(
                 "Missing one or more files for %s: %r"
                 % (self._directory_format.__class__.__name__, self.pathspec))
 
+    def _make_validator(self, path, level):
+        def validate():
+            self.format(path, mode='r').validate(level)
+        return validate
+
     @property
     def path_maker(self):
         def bound_path_maker(**kwargs):
-            # Must wrap in a naive Path, otherwise an OutPath would be summoned
-            # into this world, and would destroy everything in its path.
-            path = (pathlib.Path(self._directory_format.path) /
-                    self._path_maker(self._directory_format, **kwargs))
             # NOTE: path makers are bound to the directory format, so must be
             # provided as the first argument which will look like `self` to
             # the plugin-dev.
+            relpath = self._path_maker(self._directory_format, **kwargs)
+            # Must wrap in a naive Path, otherwise an OutPath would be summoned
+            # into this world, and would destroy everything in its path.
+            path = pathlib.Path(self._directory_format._path) / relpath
             path.parent.mkdir(parents=True, exist_ok=True)
+
+            members = self._directory_format._lazy_members()
+            if members is not None:
+                members.mount(relpath)
             return path
         return bound_path_maker
 
@@ -129,14 +146,17 @@ class BoundFileCollection(BoundFile):
 
     def iter_views(self, view_type):
         # Don't want an OutPath, just a Path
-        root = pathlib.Path(self._directory_format.path)
-        paths = [fp for fp in sorted(root.glob('**/*'))
+        root = pathlib.Path(self._directory_format._path)
+        members = self._directory_format._lazy_members()
+        paths = [fp for fp in self._directory_format._iter_paths()
                  if re.match(self.pathspec, str(fp.relative_to(root)))]
         from_type = transform.ModelType.from_view_type(self.format)
         to_type = transform.ModelType.from_view_type(view_type)
 
         transformation = from_type.make_transformation(to_type)
         for fp in paths:
+            if members is not None:
+                members.mount(fp.relative_to(root))
             # TODO: include capture?
             yield fp.relative_to(root), transformation(fp)
 
@@ -159,14 +179,29 @@ class _DirectoryMeta(type):
 
 
 class DirectoryFormat(FormatBase, metaclass=_DirectoryMeta):
+    def _lazy_members(self):
+        # The members of a lazily loaded archive which have yet to be mounted
+        # (if any), see `qiime2.core.archive.Archiver.lazy_data_dir`.
+        members = getattr(self._path, '_members', None)
+        if members is None or members.mounted:
+            return None
+        return members
+
+    def _iter_paths(self):
+        # Sorted paths of the files in this directory format, without
+        # mounting them when they belong to a lazily loaded archive.
+        members = self._lazy_members()
+        if members is None:
+            return sorted(p for p in self._path.glob('**/*') if p.is_file())
+        return sorted(self._path / relpath for relpath in members)
+
     def validate(self, level='max'):
         _check_validation_level(level)
 
-        if not self.path.is_dir():
-            raise ValidationError("%s is not a directory." % self.path)
-        collected_paths = {p: None for p in self.path.glob('**/*')
-                           if not p.name.startswith('.') and
-                           p.is_file()}
+        if not self._path.is_dir():
+            raise ValidationError("%s is not a directory." % self._path)
+        collected_paths = {p: None for p in self._iter_paths()
+                           if not p.name.startswith('.')}
         for field in self._fields:
             getattr(self, field)._validate_members(collected_paths, level)
 
@@ -85,6 +85,7 @@ class TestPlugin(unittest.TestCase):
                           'typical_pipeline', 'optional_artifact_pipeline',
                           'pointless_pipeline', 'visualizer_only_pipeline',
                           'pipelines_in_pipeline', 'failing_pipeline',
+                          'parallel_pipeline', 'lazy_pipeline',
                           'docstring_order_method',
                           'constrained_input_visualization',
                           'combinatorically_mapped_method',
@@ -144,7 +145,8 @@ class TestPlugin(unittest.TestCase):
                          {'parameter_only_pipeline', 'typical_pipeline',
                           'optional_artifact_pipeline', 'pointless_pipeline',
                           'visualizer_only_pipeline', 'pipelines_in_pipeline',
-                          'failing_pipeline'})
+                          'failing_pipeline', 'parallel_pipeline',
+                          'lazy_pipeline'})
         for pipeline in pipelines.values():
             self.assertIsInstance(pipeline, qiime2.sdk.Pipeline)
 
@@ -6,7 +6,7 @@
 # The full license is in the file LICENSE, distributed with this software.
 # ----------------------------------------------------------------------------
 
-from .context import Context
+from .context import Context, ParallelContext, LazyContext, ProxyResult
 from .action import Action, Method, Visualizer, Pipeline
 from .plugin_manager import PluginManager
 from .result import Result, Artifact, Visualization
@@ -16,4 +16,5 @@ from ..core.cite import Citations
 
 __all__ = ['Result', 'Results', 'Artifact', 'Visualization', 'Action',
            'Method', 'Visualizer', 'Pipeline', 'PluginManager', 'parse_type',
-           'parse_format', 'type_from_ast', 'Context', 'Citations']
+           'parse_format', 'type_from_ast', 'Context', 'ParallelContext',
+           'LazyContext', 'ProxyResult', 'Citations']
@@ -7,11 +7,12 @@
 # ----------------------------------------------------------------------------
 
 import abc
+import atexit
 import concurrent.futures
 import inspect
 import tempfile
 import textwrap
-import itertools
+import threading
 
 import decorator
 
@@ -21,24 +22,125 @@ import qiime2.core.archive as archive
 from qiime2.core.util import LateBindingAttribute, DropFirstParameter, tuplize
 
 
+# Only the location of a Result's files is sent to or from a worker process,
+# which uses them in place instead of receiving a copy of the archiver's state.
+def _to_references(value):
+    if isinstance(value, qiime2.sdk.Result):
+        return value._get_reference()
+    # Inputs of collection types (e.g. `List[IntSequence1]`).
+    if isinstance(value, (list, set)):
+        return type(value)(_to_references(v) for v in value)
+    return value
+
+
+def _from_references(value):
+    if isinstance(value, archive.ArchiverReference):
+        # The caller keeps its inputs alive until this call is done, and is
+        # the one to clean them up afterwards.
+        return qiime2.sdk.Result._from_reference(value, owned=False)
+    if isinstance(value, (list, set)):
+        return type(value)(_from_references(v) for v in value)
+    return value
+
+
 def _subprocess_apply(action, args, kwargs):
-    # Preprocess input artifacts as we've got pickled clones which shouldn't
-    # self-destruct.
-    for arg in itertools.chain(args, kwargs.values()):
-        if isinstance(arg, qiime2.sdk.Artifact):
-            # We can't rely on the subprocess preventing atexit hooks as the
-            # destructor is also called when the artifact goes out of scope
-            # (which happens).
-            arg._destructor.detach()
+    args = [_from_references(arg) for arg in args]
+    kwargs = {k: _from_references(v) for k, v in kwargs.items()}
 
     results = action(*args, **kwargs)
+    references = []
     for r in results:
-        # The destructor doesn't keep its detatched state when sent back to the
-        # main process. Something about the context-manager from ctx seems to
-        # cause a GC of the artifacts before the process actually ends, so we
-        # do need to detach these. The specifics are not understood.
+        # The files of the results now belong to the calling process, which
+        # takes over cleaning them up.
         r._destructor.detach()
-    return results
+        references.append(r._get_reference())
+    return results._fields, references
+
+
+class _ReferenceFuture(concurrent.futures.Future):
+    """The future of `_subprocess_apply`, resolved into Results."""
+    def __init__(self, future, inputs):
+        super().__init__()
+        self._future = future
+        # Keeps the inputs' files around for as long as the worker needs them.
+        self._inputs = inputs
+        future.add_done_callback(self._resolve)
+
+    def cancel(self):
+        # Cancelling `_future` cancels this future too, through `_resolve`.
+        return self._future.cancel()
+
+    def running(self):
+        return self._future.running()
+
+    def _resolve(self, future):
+        self._inputs = None
+        if future.cancelled():
+            super().cancel()
+            return
+        exc = future.exception()
+        if exc is not None:
+            self.set_exception(exc)
+            return
+        fields, references = future.result()
+        try:
+            results = qiime2.sdk.Results(
+                fields, [qiime2.sdk.Result._from_reference(ref, owned=True)
+                         for ref in references])
+        except Exception as e:
+            # Otherwise this future would never be done.
+            self.set_exception(e)
+            return
+        self.set_result(results)
+
+
+# The executor `asynchronous` submits to, with the configuration it was made
+# for. It is shared by every action so that its workers (and the plugins they
+# have imported) are reused from one call to the next.
+_async_executor = (None, None)
+_async_executor_lock = threading.Lock()
+
+
+def _get_async_executor(replace=False):
+    global _async_executor
+
+    config = (Action.ASYNC_BACKEND, Action.ASYNC_WORKERS)
+    with _async_executor_lock:
+        current, executor = _async_executor
+        if executor is None or current != config or replace:
+            backend, workers = config
+            if backend == 'process':
+                new = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=workers)
+            elif backend == 'thread':
+                new = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=workers)
+            else:
+                raise ValueError("Unknown asynchronous backend: %r (must be"
+                                 " 'process' or 'thread')." % backend)
+            if executor is not None:
+                # Anything already submitted still runs to completion.
+                executor.shutdown(wait=False)
+            executor = new
+            _async_executor = (config, executor)
+    return executor
+
+
+@atexit.register
+def shutdown_async_executor(wait=True):
+    """Shut down the workers used by `asynchronous`.
+
+    They are started again as needed, so this is only useful for releasing
+    them early. Futures which are already running are not cancelled.
+
+    """
+    global _async_executor
+
+    with _async_executor_lock:
+        _, executor = _async_executor
+        _async_executor = (None, None)
+    if executor is not None:
+        executor.shutdown(wait=wait)
 
 
 class Action(metaclass=abc.ABCMeta):
@@ -46,6 +148,16 @@ class Action(metaclass=abc.ABCMeta):
     type = 'action'
     _ProvCaptureCls = archive.ActionProvenanceCapture
 
+    # How `asynchronous` runs actions, either in a pool of worker processes
+    # ('process') or of threads ('thread'). The pool is shared by all actions
+    # and has `ASYNC_WORKERS` workers, one per CPU if that is None. Changing
+    # either only affects actions submitted afterwards.
+    ASYNC_BACKEND = 'process'
+    ASYNC_WORKERS = None
+    # A `qiime2.sdk.cache.ResultCache` which actions called with the same
+    # arguments as before load their results from instead of running again.
+    RESULT_CACHE = None
+
     __call__ = LateBindingAttribute('_dynamic_call')
     asynchronous = LateBindingAttribute('_dynamic_async')
 
@@ -202,6 +314,18 @@ class Action(metaclass=abc.ABCMeta):
                 # Type management
                 self.signature.check_types(**user_input)
                 output_types = self.signature.solve_output(**user_input)
+
+                cache = self.RESULT_CACHE
+                if cache is not None:
+                    key = cache.get_key(self, user_input)
+                    outputs = cache.get(key)
+                    if outputs is not None and \
+                            len(outputs) == len(self.signature.outputs):
+                        for output in outputs:
+                            scope.add_parent_reference(output)
+                        return qiime2.sdk.Results(
+                            self.signature.outputs.keys(), outputs)
+
                 callable_args = {}
 
                 # Record parameters
@@ -245,6 +369,13 @@ class Action(metaclass=abc.ABCMeta):
                         "outputs defined in signature: %d != %d" %
                         (len(outputs), len(self.signature.outputs)))
 
+                if cache is not None:
+                    try:
+                        cache.add(key, outputs)
+                    except OSError:
+                        # The cache is only an optimization.
+                        pass
+
                 # Wrap in a Results object mapping output name to value so
                 # users have access to outputs by name or position.
                 return qiime2.sdk.Results(self.signature.outputs.keys(),
@@ -280,19 +411,42 @@ class Action(metaclass=abc.ABCMeta):
             # function's signature.
             args = args[1:]
 
-            pool = concurrent.futures.ProcessPoolExecutor(max_workers=1)
-            future = pool.submit(_subprocess_apply, self, args, kwargs)
-            # TODO: pool.shutdown(wait=False) caused the child process to
-            # hang unrecoverably. This seems to be a bug in Python 3.7
-            # It's probably best to gut concurrent.futures entirely, so we're
-            # ignoring the resource leakage for the moment.
-            return future
+            return self._submit(args, kwargs)
 
         async_wrapper = self._rewrite_wrapper_signature(async_wrapper)
         self._set_wrapper_properties(async_wrapper)
         self._set_wrapper_name(async_wrapper, 'asynchronous')
         return async_wrapper
 
+    def _submit(self, args, kwargs, bound_callable=None):
+        """Run this action in the pool used by `asynchronous`.
+
+        Threads call `bound_callable` (by default, this action as called by
+        users) directly. Worker processes call this action on references to
+        the artifacts in `args` and `kwargs`, see `_subprocess_apply`.
+
+        """
+        executor = _get_async_executor()
+        if isinstance(executor, concurrent.futures.ThreadPoolExecutor):
+            # Threads share the caller's artifacts as they are.
+            if bound_callable is None:
+                bound_callable = self
+            return executor.submit(bound_callable, *args, **kwargs)
+
+        # Artifacts are handed over by reference to their files, which stay
+        # where they are.
+        ref_args = [_to_references(arg) for arg in args]
+        ref_kwargs = {k: _to_references(v) for k, v in kwargs.items()}
+        try:
+            future = executor.submit(
+                _subprocess_apply, self, ref_args, ref_kwargs)
+        except concurrent.futures.process.BrokenProcessPool:
+            # A worker died (e.g. was killed), which leaves the whole pool
+            # unusable.
+            future = _get_async_executor(replace=True).submit(
+                _subprocess_apply, self, ref_args, ref_kwargs)
+        return _ReferenceFuture(future, (args, kwargs))
+
     def _rewrite_wrapper_signature(self, wrapper):
         # Convert the callable's signature into the wrapper's signature and set
         # it on the wrapper.
@@ -470,12 +624,44 @@ class Pipeline(Action):
     type = 'pipeline'
     _ProvCaptureCls = archive.PipelineProvenanceCapture
 
+    # Like `__call__`, except that the actions the pipeline calls run
+    # concurrently, see `qiime2.sdk.ParallelContext`.
+    parallel = LateBindingAttribute('_dynamic_parallel')
+    # Like `__call__`, except that the actions the pipeline calls are
+    # scheduled by their dependencies, see `qiime2.sdk.LazyContext`.
+    lazy = LateBindingAttribute('_dynamic_lazy')
+
+    @property
+    def _dynamic_parallel(self):
+        return self._get_context_wrapper('parallel',
+                                         qiime2.sdk.ParallelContext)
+
+    @property
+    def _dynamic_lazy(self):
+        return self._get_context_wrapper('lazy', qiime2.sdk.LazyContext)
+
+    def _get_context_wrapper(self, name, context_factory):
+        # These are only made when first used, as most pipelines never are.
+        wrappers = self.__dict__.setdefault('_context_wrappers', {})
+        try:
+            return wrappers[name]
+        except KeyError:
+            pass
+        wrapper = self._bind(context_factory)
+        self._set_wrapper_name(wrapper, name)
+        wrappers[name] = wrapper
+        return wrapper
+
     def _callable_sig_converter_(self, callable):
         return DropFirstParameter.from_function(callable)
 
     def _callable_executor_(self, scope, view_args, output_types, provenance):
         outputs = self._callable(scope.ctx, **view_args)
         outputs = tuplize(outputs)
+        # Only a `LazyContext` makes proxies.
+        outputs = tuple(output.result()
+                        if isinstance(output, qiime2.sdk.ProxyResult)
+                        else output for output in outputs)
 
         for output in outputs:
             if not isinstance(output, qiime2.sdk.Result):
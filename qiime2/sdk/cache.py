@@ -0,0 +1,83 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2016-2020, QIIME 2 development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# ----------------------------------------------------------------------------
+
+import hashlib
+import importlib
+import json
+import os
+
+import qiime2
+import qiime2.sdk
+from qiime2.core.archive.provenance import get_metadata_digest
+from qiime2.core.cache import DiskCache
+
+
+def _encode(value):
+    if isinstance(value, qiime2.sdk.Result):
+        # Results are immutable, so their UUID stands for their contents.
+        return str(value.uuid)
+    if isinstance(value, (qiime2.Metadata, qiime2.MetadataColumn)):
+        return {'metadata': get_metadata_digest(value)}
+    if isinstance(value, (set, frozenset)):
+        return sorted((_encode(v) for v in value), key=repr)
+    if isinstance(value, (list, tuple)):
+        return [_encode(v) for v in value]
+    if isinstance(value, dict):
+        return sorted([k, _encode(v)] for k, v in value.items())
+    return value
+
+
+class ResultCache(DiskCache):
+    """An on-disk cache of the results of actions.
+
+    Entries are keyed by the version of the framework and of the action's
+    plugin, the action, and its arguments: the UUIDs of its inputs, the
+    contents of its metadata and the values of its other parameters. An
+    action called with the same arguments as before loads the results it
+    returned then, provenance included, instead of running again. Only use
+    this with actions which always make the same results from the same
+    arguments.
+
+    See `qiime2.core.cache.DiskCache` for the parameters.
+
+    """
+    OUTPUTS_FILE = 'OUTPUTS'
+
+    def get_key(self, action, arguments):
+        plugin = importlib.import_module(action.package).__plugin__
+        key = [qiime2.__version__, plugin.name, plugin.version, action.id,
+               [[name, _encode(arguments[name])]
+                for name in action.signature.signature_order]]
+        return hashlib.md5(
+            json.dumps(key, default=repr).encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """Load the results cached under `key`, or return None."""
+        entry = self._get_entry(key)
+        if entry is None:
+            return None
+        try:
+            filenames = json.loads((entry / self.OUTPUTS_FILE).read_text())
+            return [qiime2.sdk.Result.load(str(entry / filename))
+                    for filename in filenames]
+        except (FileNotFoundError, ValueError):
+            # Evicted by another process while it was being loaded.
+            return None
+
+    def add(self, key, results):
+        def build(staging):
+            filenames = []
+            size = 0
+            for idx, result in enumerate(results):
+                filepath = result.save(str(staging / str(idx)))
+                filenames.append(os.path.basename(filepath))
+                size += os.path.getsize(filepath)
+            (staging / self.OUTPUTS_FILE).write_text(json.dumps(filenames))
+            return size
+
+        self._publish(key, build)
@@ -6,6 +6,11 @@
 # The full license is in the file LICENSE, distributed with this software.
 # ----------------------------------------------------------------------------
 
+import concurrent.futures
+import functools
+import threading
+import weakref
+
 import qiime2.sdk
 
 
@@ -20,6 +25,14 @@ class Context:
         This function is aware of the pipeline context and manages its own
         cleanup as appropriate.
         """
+        action_obj = self._get_action(plugin, action)
+        # This factory will create new Contexts with this context as their
+        # parent. This allows scope cleanup to happen recursively.
+        # A factory is necessary so that independent applications of the
+        # returned callable recieve their own Context objects.
+        return action_obj._bind(lambda: Context(parent=self))
+
+    def _get_action(self, plugin, action):
         pm = qiime2.sdk.PluginManager()
         plugin = plugin.replace('_', '-')
         try:
@@ -32,11 +45,7 @@ class Context:
         except KeyError:
             raise ValueError("An action named %r was not found for plugin %r"
                              % (action, plugin))
-        # This factory will create new Contexts with this context as their
-        # parent. This allows scope cleanup to happen recursively.
-        # A factory is necessary so that independent applications of the
-        # returned callable recieve their own Context objects.
-        return action_obj._bind(lambda: Context(parent=self))
+        return action_obj
 
     def make_artifact(self, type, view, view_type=None):
         """Return a new artifact from a given view.
@@ -77,6 +86,206 @@ class Context:
                     self._parent._scope.add_reference(ref)
 
 
+class ParallelContext(Context):
+    """A Context whose actions run concurrently.
+
+    The functions returned by `get_action` return a
+    `concurrent.futures.Future` of the action's Results rather than the
+    Results themselves, so that independent actions (e.g. one per sample) run
+    side by side. They run in the pool used by `Action.asynchronous` (see
+    `Action.ASYNC_BACKEND` and `Action.ASYNC_WORKERS`). Actions called in turn
+    by those actions (i.e. by a nested pipeline) run one after another.
+
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent=parent)
+        self._futures = []
+
+    def get_action(self, plugin: str, action: str):
+        """Return a function matching the callable API of an action, except
+        that it returns a future of the action's Results.
+
+        This function is aware of the pipeline context and manages its own
+        cleanup as appropriate.
+        """
+        action_obj = self._get_action(plugin, action)
+        bound_callable = action_obj._bind(lambda: Context(parent=self))
+
+        @functools.wraps(bound_callable)
+        def submit(*args, **kwargs):
+            future = action_obj._submit(args, kwargs, bound_callable)
+            self._futures.append(future)
+            return future
+        return submit
+
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        if exc_type is not None:
+            for future in self._futures:
+                future.cancel()
+        # Actions which are still running hold on to this scope.
+        concurrent.futures.wait(self._futures)
+        for future in self._futures:
+            if not future.cancelled() and future.exception() is None:
+                # Results made in another process aren't tracked by this
+                # scope yet. Adding them twice does no harm.
+                for result in future.result():
+                    self._scope.add_reference(result)
+        super().__exit__(exc_type, exc_value, exc_tb)
+
+
+class ProxyResult:
+    """Stands in for an output of an action which may not have run yet.
+
+    Attributes are those of the Result (e.g. `view`), which is waited for on
+    first access. Passing a proxy as the input of another action of the same
+    `LazyContext` doesn't wait for it.
+
+    """
+    def __init__(self, future, index):
+        self._future = future
+        self._index = index
+        # Unless the pipeline uses it directly, the result is destroyed as
+        # soon as neither this proxy nor an action waiting on it remain.
+        self._release = weakref.finalize(self, _release_result, future, index)
+
+    def result(self, timeout=None):
+        """Wait for and return the Result."""
+        # The pipeline may hold on to the Result itself from now on, so it is
+        # left to the scope to clean up.
+        self._release.detach()
+        return self._get(timeout)
+
+    def done(self):
+        return self._future.done()
+
+    def _get(self, timeout=None):
+        return self._future.result(timeout)[self._index]
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(self.result(), name)
+
+    def __repr__(self):
+        if self._future.done():
+            return '<%s of %r>' % (self.__class__.__name__, self._get())
+        return '<%s (pending)>' % self.__class__.__name__
+
+
+def _release_result(future, index):
+    def release(future):
+        if not future.cancelled() and future.exception() is None:
+            future.result()[index]._destructor()
+    future.add_done_callback(release)
+
+
+def _find_proxies(value):
+    if isinstance(value, ProxyResult):
+        yield value
+    elif isinstance(value, (list, set)):
+        for v in value:
+            yield from _find_proxies(v)
+
+
+def _resolve_proxies(value):
+    if isinstance(value, ProxyResult):
+        return value._get()
+    if isinstance(value, (list, set)):
+        return type(value)(_resolve_proxies(v) for v in value)
+    return value
+
+
+class _Application:
+    """An action applied to inputs which may not have been made yet.
+
+    It is submitted once the actions making its inputs are all done, and its
+    `future` is that of the action's Results.
+
+    """
+    def __init__(self, action, bound_callable, args, kwargs):
+        self.future = concurrent.futures.Future()
+        self._action = action
+        self._bound_callable = bound_callable
+        self._args = args
+        self._kwargs = kwargs
+
+        self._lock = threading.Lock()
+        self._waiting = {proxy._future for proxy in
+                         _find_proxies([*args, *kwargs.values()])}
+        if not self._waiting:
+            self._submit()
+        for future in list(self._waiting):
+            future.add_done_callback(self._input_done)
+
+    def _input_done(self, future):
+        with self._lock:
+            self._waiting.discard(future)
+            ready = not self._waiting
+        if ready:
+            self._submit()
+
+    def _submit(self):
+        if not self.future.set_running_or_notify_cancel():
+            return
+        try:
+            # Raises if an input failed to be made.
+            args = [_resolve_proxies(arg) for arg in self._args]
+            kwargs = {k: _resolve_proxies(v) for k, v in self._kwargs.items()}
+            future = self._action._submit(args, kwargs, self._bound_callable)
+        except Exception as e:
+            self._args = self._kwargs = None
+            self.future.set_exception(e)
+            return
+        future.add_done_callback(self._done)
+
+    def _done(self, future):
+        # Letting go of the proxies of the inputs before anyone can see that
+        # this action is done lets intermediate results go just as early.
+        self._args = self._kwargs = None
+        if future.cancelled():
+            self.future.set_exception(concurrent.futures.CancelledError())
+        elif future.exception() is not None:
+            self.future.set_exception(future.exception())
+        else:
+            self.future.set_result(future.result())
+
+
+class LazyContext(ParallelContext):
+    """A ParallelContext which schedules actions by their dependencies.
+
+    The functions returned by `get_action` return right away, with Results
+    made of `ProxyResult` objects. Each action is submitted as soon as the
+    actions making its inputs are done, so independent actions run side by
+    side however the pipeline is written. An intermediate result is destroyed
+    once the actions taking it as input are done and the pipeline no longer
+    refers to it, unless the pipeline used it directly (e.g. viewed it).
+
+    As proxies behave like Results, pipelines which only pass results from one
+    action to the next work the same way with a plain Context.
+
+    """
+    def get_action(self, plugin: str, action: str):
+        """Return a function matching the callable API of an action, except
+        that its Results are `ProxyResult` objects.
+
+        This function is aware of the pipeline context and manages its own
+        cleanup as appropriate.
+        """
+        action_obj = self._get_action(plugin, action)
+        bound_callable = action_obj._bind(lambda: Context(parent=self))
+
+        @functools.wraps(bound_callable)
+        def schedule(*args, **kwargs):
+            future = _Application(action_obj, bound_callable, args,
+                                  kwargs).future
+            self._futures.append(future)
+            outputs = action_obj.signature.outputs
+            return qiime2.sdk.Results(
+                outputs.keys(),
+                [ProxyResult(future, i) for i in range(len(outputs))])
+        return schedule
+
+
 class Scope:
     def __init__(self, ctx):
         self.ctx = ctx
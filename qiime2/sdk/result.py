@@ -8,7 +8,9 @@
 
 import os
 import shutil
+import stat
 import collections
+import concurrent.futures
 import distutils.dir_util
 import pathlib
 
@@ -55,15 +57,37 @@ class Result:
     def peek(cls, filepath):
         return ResultMetadata(*archive.Archiver.peek(filepath))
 
+    @classmethod
+    def peek_many(cls, filepaths, workers=None):
+        """Peek at many results at once, in the order of `filepaths`.
+
+        Archives are read on a pool of `workers` threads (None uses one per
+        CPU). The first error encountered is raised.
+
+        """
+        filepaths = list(filepaths)
+        if workers is None:
+            workers = os.cpu_count() or 1
+        workers = max(min(workers, len(filepaths)), 1)
+
+        with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+            return list(executor.map(cls.peek, filepaths))
+
     @classmethod
     def extract(cls, filepath, output_dir):
         """Unzip contents of Artifacts and Visualizations."""
         return archive.Archiver.extract(filepath, output_dir)
 
     @classmethod
-    def load(cls, filepath):
-        """Factory for loading Artifacts and Visualizations."""
-        archiver = archive.Archiver.load(filepath)
+    def load(cls, filepath, lazy=False):
+        """Factory for loading Artifacts and Visualizations.
+
+        When `lazy` is True, only the archive's metadata is read up front and
+        the data and provenance are extracted the first time they are needed.
+        The archive at `filepath` must not be modified or removed until then.
+
+        """
+        archiver = archive.Archiver.load(filepath, lazy=lazy)
 
         if Artifact._is_valid_type(archiver.type):
             result = Artifact.__new__(Artifact)
@@ -84,6 +108,19 @@ class Result:
         result._archiver = archiver
         return result
 
+    @classmethod
+    def _from_reference(cls, reference, owned=False):
+        """Counterpart of `_get_reference`, see `Archiver.from_reference`."""
+        archiver = archive.Archiver.from_reference(reference, owned=owned)
+
+        if Artifact._is_valid_type(archiver.type):
+            result = Artifact.__new__(Artifact)
+        else:
+            result = Visualization.__new__(Visualization)
+
+        result._archiver = archiver
+        return result
+
     @property
     def type(self):
         return self._archiver.type
@@ -100,6 +137,17 @@ class Result:
     def citations(self):
         return self._archiver.citations
 
+    @property
+    def provenance(self):
+        """The provenance graph of this result.
+
+        Nodes are read from the archive as they are needed, so a lazily
+        loaded result is not extracted to inspect its provenance. None for
+        results without provenance (archive version 0).
+
+        """
+        return self._archiver.provenance
+
     def __init__(self):
         raise NotImplementedError(
             "%(classname)s constructor is private, use `%(classname)s.load`, "
@@ -133,8 +181,13 @@ class Result:
         return not (self == other)
 
     def export_data(self, output_dir):
-        distutils.dir_util.copy_tree(
+        exported = distutils.dir_util.copy_tree(
             str(self._archiver.data_dir), str(output_dir))
+        # Data shared from the extraction cache is read-only, the user's
+        # copy of it isn't.
+        for filepath in exported:
+            mode = os.stat(filepath).st_mode
+            os.chmod(filepath, mode | stat.S_IWUSR)
         # Return None for now, although future implementations that include
         # format tranformations may return the invoked transformers
         return None
@@ -143,10 +196,23 @@ class Result:
     def _destructor(self):
         return self._archiver._destructor
 
-    def save(self, filepath):
+    def _get_reference(self):
+        return self._archiver.get_reference()
+
+    def save(self, filepath, workers=1, compression=None):
+        """Save to `filepath`, appending the extension if it is missing.
+
+        With more than one of `workers` the archive's members are compressed
+        on that many threads (None uses one per CPU); the file written is the
+        same either way. `compression` is a
+        `qiime2.core.archive.CompressionPolicy` deciding how each member is
+        compressed, by default deflating all of them.
+
+        """
         if not filepath.endswith(self.extension):
             filepath += self.extension
-        self._archiver.save(filepath)
+        self._archiver.save(filepath, workers=workers,
+                            compression=compression)
         return filepath
 
     def _alias(self, provenance_capture):
@@ -159,12 +225,25 @@ class Result:
 
         cls = type(self)
         alias = cls.__new__(cls)
+        # The links are the same files as the original's, so whatever the
+        # original's ledger computed for them still holds until they are
+        # modified. Anything it can't vouch for is hashed again.
         alias._archiver = archive.Archiver.from_data(
-            self.type, self.format, clone_original, provenance_capture)
+            self.type, self.format, clone_original, provenance_capture,
+            ledger=self._archiver.ledger)
         return alias
 
-    def validate(self, level=NotImplemented):
-        diff = self._archiver.validate_checksums()
+    def validate(self, level=NotImplemented, incremental=False, sample=None,
+                 workers=1, fail_fast=False):
+        """Check the archive's files against their recorded checksums.
+
+        `incremental`, `sample`, `workers` and `fail_fast` trade thoroughness
+        for speed, see `qiime2.core.archive.Archiver.validate_checksums`.
+
+        """
+        diff = self._archiver.validate_checksums(
+            incremental=incremental, sample=sample, workers=workers,
+            fail_fast=fail_fast)
         if diff.changed or diff.added or diff.removed:
             error = ""
 
@@ -225,12 +304,14 @@ class Artifact(Result):
 
         format_ = None
         md5sums = None
+        # Lets the archive reuse the checksums of the imported files
+        ledger = util.ChecksumLedger()
         if is_format:
             path = pathlib.Path(view)
             if path.is_file():
-                md5sums = {path.name: util.md5sum(path)}
+                md5sums = {path.name: ledger.md5sum(path)}
             elif path.is_dir():
-                md5sums = util.md5sum_directory(path)
+                md5sums = util.md5sum_directory(path, ledger=ledger)
             else:
                 raise qiime2.plugin.ValidationError(
                     "Path '%s' does not exist." % path)
@@ -238,11 +319,11 @@ class Artifact(Result):
 
         provenance_capture = archive.ImportProvenanceCapture(format_, md5sums)
         return cls._from_view(type_, view, view_type, provenance_capture,
-                              validate_level='max')
+                              validate_level='max', ledger=ledger)
 
     @classmethod
     def _from_view(cls, type, view, view_type, provenance_capture,
-                   validate_level='min'):
+                   validate_level='min', ledger=None):
         if isinstance(type, str):
             type = qiime2.sdk.parse_type(type)
 
@@ -266,11 +347,14 @@ class Artifact(Result):
                                                        recorder=recorder)
         result = transformation(view, validate_level)
 
+        def data_initializer(data_dir):
+            result.path._move_or_copy(data_dir, ledger=ledger)
+
         artifact = cls.__new__(cls)
         artifact._archiver = archive.Archiver.from_data(
             type, output_dir_fmt,
-            data_initializer=result.path._move_or_copy,
-            provenance_capture=provenance_capture)
+            data_initializer=data_initializer,
+            provenance_capture=provenance_capture, ledger=ledger)
         return artifact
 
     def view(self, view_type):
@@ -286,7 +370,7 @@ class Artifact(Result):
 
         transformation = from_type.make_transformation(to_type,
                                                        recorder=recorder)
-        result = transformation(self._archiver.data_dir)
+        result = transformation(self._archiver.lazy_data_dir)
 
         if view_type is qiime2.Metadata:
             result._add_artifacts([self])
@@ -308,15 +392,20 @@ class Artifact(Result):
         to_type = transform.ModelType.from_view_type(qiime2.Metadata)
         return from_type.has_transformation(to_type)
 
-    def validate(self, level='max'):
+    def validate(self, level='max', incremental=False, sample=None,
+                 workers=1, fail_fast=False):
         """ Validates the data contents of an artifact
 
+        The checksums of the artifact's files are checked first, see
+        `Result.validate` for the remaining parameters.
+
         Raises
         ------
         ValidationError
             If the artifact is invalid at the specified level of validation.
         """
-        super().validate()
+        super().validate(incremental=incremental, sample=sample,
+                         workers=workers, fail_fast=fail_fast)
 
         self.format.validate(self.view(self.format), level)
 
@@ -330,16 +419,17 @@ class Visualization(Result):
 
     @classmethod
     def _from_data_dir(cls, data_dir, provenance_capture):
+        ledger = util.ChecksumLedger()
+
         # shutil.copytree doesn't allow the destination directory to exist.
         def data_initializer(destination):
-            return distutils.dir_util.copy_tree(
-                str(data_dir), str(destination))
+            return ledger.copy(data_dir, destination)
 
         viz = cls.__new__(cls)
         viz._archiver = archive.Archiver.from_data(
             qiime2.core.type.Visualization, None,
             data_initializer=data_initializer,
-            provenance_capture=provenance_capture)
+            provenance_capture=provenance_capture, ledger=ledger)
         return viz
 
     def get_index_paths(self, relative=True):
@@ -361,4 +451,5 @@ class Visualization(Result):
 
     def _repr_html_(self):
         from qiime2.jupyter import make_html
+        self._archiver.mount()
         return make_html(str(self._archiver.path))
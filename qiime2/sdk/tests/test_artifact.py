@@ -10,8 +10,10 @@ import collections
 import os
 import tempfile
 import unittest
+import unittest.mock as mock
 import uuid
 import pathlib
+import zipfile
 import pkg_resources
 
 import pandas as pd
@@ -23,8 +25,10 @@ from qiime2.sdk import Artifact
 from qiime2.sdk.result import ResultMetadata
 from qiime2.plugin.model import ValidationError
 import qiime2.core.archive as archive
+import qiime2.core.util as util
 
-from qiime2.core.testing.format import IntSequenceFormat
+from qiime2.core.testing.format import (IntSequenceFormat,
+                                        FourIntsDirectoryFormat)
 from qiime2.core.testing.type import IntSequence1, FourInts, Mapping, SingleInt
 from qiime2.core.testing.util import get_dummy_plugin, ArchiveTestingMixin
 
@@ -113,6 +117,7 @@ class TestArtifact(unittest.TestCase, ArchiveTestingMixin):
             'provenance/metadata.yaml',
             'provenance/VERSION',
             'provenance/citations.bib',
+            'provenance/index.json',
             'provenance/action/action.yaml'
         }
 
@@ -130,6 +135,65 @@ class TestArtifact(unittest.TestCase, ArchiveTestingMixin):
         self.assertEqual(artifact.view(list), [-1, 42, 0, 43])
         self.assertEqual(artifact.view(list), [-1, 42, 0, 43])
 
+    def test_load_lazy(self):
+        saved_artifact = Artifact.import_data(FourInts, [-1, 42, 0, 43])
+        fp = os.path.join(self.test_dir.name, 'artifact.qza')
+        saved_artifact.save(fp)
+
+        artifact = Artifact.load(fp, lazy=True)
+
+        self.assertEqual(artifact.type, FourInts)
+        self.assertEqual(artifact.uuid, saved_artifact.uuid)
+        self.assertEqual(artifact.view(list), [-1, 42, 0, 43])
+        self.assertEqual(artifact.view(list), [-1, 42, 0, 43])
+        artifact.validate()
+
+    def test_load_lazy_mounts_members_on_demand(self):
+        saved_artifact = Artifact.import_data(FourInts, [-1, 42, 0, 43])
+        fp = os.path.join(self.test_dir.name, 'artifact.qza')
+        saved_artifact.save(fp)
+
+        artifact = Artifact.load(fp, lazy=True)
+        data_dir = (artifact._archiver.path / str(artifact.uuid) / 'data')
+        fmt = artifact.view(FourIntsDirectoryFormat)
+
+        self.assertEqual({str(p.relative_to(data_dir))
+                          for p in data_dir.glob('**/*') if p.is_file()},
+                         set())
+
+        path = fmt.single_ints.path_maker(num=3)
+        self.assertEqual(path.read_text(), '0\n')
+        self.assertEqual({str(p.relative_to(data_dir))
+                          for p in data_dir.glob('**/*') if p.is_file()},
+                         {'nested/file3.txt'})
+
+        # Using the path directly needs the entire directory.
+        self.assertEqual(len(list(fmt.path.glob('**/*.txt'))), 4)
+
+    def test_load_lazy_defers_member_validation(self):
+        fp = os.path.join(self.test_dir.name, 'artifact.qza')
+        bad_fp = os.path.join(self.test_dir.name, 'bad-artifact.qza')
+        Artifact.import_data(FourInts, [-1, 42, 0, 43]).save(fp)
+
+        with zipfile.ZipFile(fp) as src, zipfile.ZipFile(bad_fp, 'w') as dst:
+            for name in src.namelist():
+                data = src.read(name)
+                if name.endswith('data/nested/file4.txt'):
+                    data = b'not an integer\n'
+                dst.writestr(name, data)
+
+        artifact = Artifact.load(bad_fp, lazy=True)
+        fmt = artifact.view(FourIntsDirectoryFormat)
+
+        self.assertEqual(fmt.single_ints.path_maker(num=1).read_text(),
+                         '-1\n')
+        with self.assertRaisesRegex(ValidationError, 'integer'):
+            fmt.single_ints.path_maker(num=4)
+
+        artifact = Artifact.load(bad_fp, lazy=True)
+        with self.assertRaisesRegex(ValidationError, 'integer'):
+            artifact.view(list)
+
     def test_load_different_type_with_multiple_view_types(self):
         saved_artifact = Artifact.import_data(IntSequence1,
                                               [42, 42, 43, -999, 42])
@@ -175,6 +239,7 @@ class TestArtifact(unittest.TestCase, ArchiveTestingMixin):
             'provenance/metadata.yaml',
             'provenance/VERSION',
             'provenance/citations.bib',
+            'provenance/index.json',
             'provenance/action/action.yaml'
         }
 
@@ -192,6 +257,7 @@ class TestArtifact(unittest.TestCase, ArchiveTestingMixin):
             'provenance/metadata.yaml',
             'provenance/VERSION',
             'provenance/citations.bib',
+            'provenance/index.json',
             'provenance/action/action.yaml'
         }
 
@@ -266,6 +332,7 @@ class TestArtifact(unittest.TestCase, ArchiveTestingMixin):
             'provenance/metadata.yaml',
             'provenance/VERSION',
             'provenance/citations.bib',
+            'provenance/index.json',
             'provenance/action/action.yaml'
         }
 
@@ -424,6 +491,61 @@ class TestArtifact(unittest.TestCase, ArchiveTestingMixin):
         self.assertIsInstance(artifact.uuid, uuid.UUID)
         self.assertEqual(artifact.view(list), [-1, -2, 10, 100])
 
+    def test_import_data_reuses_checksums(self):
+        data_dir = os.path.join(self.test_dir.name, 'test')
+        os.mkdir(data_dir)
+        with open(os.path.join(data_dir, 'file1.txt'), 'w') as fh:
+            fh.write('42\n')
+        with open(os.path.join(data_dir, 'file2.txt'), 'w') as fh:
+            fh.write('43\n')
+        nested_dir = os.path.join(data_dir, 'nested')
+        os.mkdir(nested_dir)
+        with open(os.path.join(nested_dir, 'file3.txt'), 'w') as fh:
+            fh.write('44\n')
+        with open(os.path.join(nested_dir, 'file4.txt'), 'w') as fh:
+            fh.write('45\n')
+
+        with mock.patch('qiime2.core.util.md5sum',
+                        wraps=util.md5sum) as md5sum:
+            artifact = Artifact.import_data(FourInts, data_dir)
+
+        hashed = [os.path.basename(str(call[0][0]))
+                  for call in md5sum.call_args_list]
+        for name in 'file1.txt', 'file2.txt', 'file3.txt', 'file4.txt':
+            self.assertEqual(hashed.count(name), 1)
+        self.assertEqual(artifact._archiver.validate_checksums(),
+                         ({}, {}, {}))
+
+    def test_alias_reuses_checksums(self):
+        artifact = Artifact.import_data(FourInts, [0, 42, 43, -1])
+
+        with mock.patch('qiime2.core.util.md5sum',
+                        wraps=util.md5sum) as md5sum:
+            alias = artifact._alias(archive.ImportProvenanceCapture())
+
+        hashed = {str(call[0][0]) for call in md5sum.call_args_list}
+        data_dir = str(alias._archiver.data_dir)
+        self.assertFalse([fp for fp in hashed if fp.startswith(data_dir)])
+        self.assertEqual(alias._archiver.validate_checksums(), ({}, {}, {}))
+        self.assertEqual(alias.view(list), [0, 42, 43, -1])
+
+    def test_alias_rehashes_modified_data(self):
+        artifact = Artifact.import_data(FourInts, [0, 42, 43, -1])
+        fp = sorted(artifact._archiver.data_dir.iterdir())[0]
+        os.chmod(str(fp), 0o644)
+        fp.write_text('1\n')
+
+        alias = artifact._alias(archive.ImportProvenanceCapture())
+
+        relpath = 'data/%s' % fp.name
+        self.assertEqual(alias._archiver.get_checksums()[relpath],
+                         util.md5sum(fp))
+        self.assertEqual(
+            alias._archiver.validate_checksums(incremental=True),
+            ({}, {}, {}))
+        self.assertNotEqual(artifact._archiver.validate_checksums(),
+                            ({}, {}, {}))
+
     def test_import_data_with_directory_multi_file(self):
         data_dir = os.path.join(self.test_dir.name, 'test')
         os.mkdir(data_dir)
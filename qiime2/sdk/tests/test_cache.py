@@ -0,0 +1,183 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2016-2020, QIIME 2 development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# ----------------------------------------------------------------------------
+
+import os
+import pathlib
+import shutil
+import tempfile
+import time
+import unittest
+import unittest.mock as mock
+
+import pandas as pd
+
+import qiime2
+from qiime2.sdk import Action, Method, Pipeline
+from qiime2.sdk.cache import ResultCache
+from qiime2.core.testing.type import IntSequence1, IntSequence2, Mapping
+from qiime2.core.testing.util import get_dummy_plugin
+
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory(
+            prefix='qiime2-test-temp-')
+        self.cache_dir = pathlib.Path(self.temp_dir.name) / 'cache'
+        self.cache = ResultCache(self.cache_dir)
+        Action.RESULT_CACHE = self.cache
+
+        self.plugin = get_dummy_plugin()
+        self.ints = qiime2.Artifact.import_data(IntSequence1, [0, 42, 43])
+
+    def tearDown(self):
+        Action.RESULT_CACHE = None
+        self.temp_dir.cleanup()
+
+    def entries(self):
+        return {p.name for p in (self.cache_dir / 'entries').iterdir()}
+
+    def call(self, action_type, action, *args, **kwargs):
+        with mock.patch.object(action_type, '_callable_executor_',
+                               autospec=True,
+                               side_effect=action_type._callable_executor_
+                               ) as executor:
+            results = action(*args, **kwargs)
+        return results, executor.call_count
+
+    def test_method(self):
+        split_ints = self.plugin.methods['split_ints']
+
+        first, executed = self.call(Method, split_ints, self.ints)
+        self.assertEqual(executed, 1)
+        self.assertEqual(len(self.entries()), 1)
+
+        second, executed = self.call(Method, split_ints, self.ints)
+        self.assertEqual(executed, 0)
+        self.assertEqual(second._fields, ('left', 'right'))
+        self.assertEqual(second.left.uuid, first.left.uuid)
+        self.assertEqual(second.right.view(list), [42, 43])
+        # The provenance of the cached results is that of the run which made
+        # them.
+        root = second.left.provenance.root
+        self.assertEqual(root.action['action']['action'], 'split_ints')
+        self.assertEqual(root.action['execution'],
+                         first.left.provenance.root.action['execution'])
+        self.assertEqual(root.parent_uuids, [str(self.ints.uuid)])
+
+    def test_different_arguments(self):
+        concatenate_ints = self.plugin.methods['concatenate_ints']
+        ints2 = qiime2.Artifact.import_data(IntSequence2, [99])
+        other = qiime2.Artifact.import_data(IntSequence1, [0, 42, 43])
+
+        concatenate_ints(self.ints, self.ints, ints2, 1, 2)
+        _, executed = self.call(Method, concatenate_ints, self.ints,
+                                self.ints, ints2, 1, 3)
+        self.assertEqual(executed, 1)
+        _, executed = self.call(Method, concatenate_ints, other, self.ints,
+                                ints2, 1, 2)
+        self.assertEqual(executed, 1)
+        self.assertEqual(len(self.entries()), 3)
+
+        results, executed = self.call(Method, concatenate_ints, self.ints,
+                                      self.ints, ints2, 1, 2)
+        self.assertEqual(executed, 0)
+        self.assertEqual(results.concatenated_ints.view(list),
+                         [0, 42, 43, 0, 42, 43, 99, 1, 2])
+
+    def test_metadata_by_contents(self):
+        identity_with_metadata = self.plugin.methods['identity_with_metadata']
+
+        def make_metadata(value):
+            index = pd.Index(['a', 'b'], name='id')
+            df = pd.DataFrame({'col1': [value, '2']}, index=index)
+            return qiime2.Metadata(df)
+
+        identity_with_metadata(self.ints, make_metadata('1'))
+        _, executed = self.call(Method, identity_with_metadata, self.ints,
+                                make_metadata('1'))
+        self.assertEqual(executed, 0)
+        _, executed = self.call(Method, identity_with_metadata, self.ints,
+                                make_metadata('3'))
+        self.assertEqual(executed, 1)
+
+    def test_pipeline(self):
+        typical_pipeline = self.plugin.pipelines['typical_pipeline']
+        mapping = qiime2.Artifact.import_data(Mapping, {'foo': '42'})
+
+        first = typical_pipeline(self.ints, mapping, False)
+        # The pipeline and each of the actions it calls.
+        self.assertEqual(len(self.entries()), 4)
+
+        second, executed = self.call(Pipeline, typical_pipeline, self.ints,
+                                     mapping, False)
+        self.assertEqual(executed, 0)
+        self.assertEqual([r.uuid for r in second], [r.uuid for r in first])
+
+        # A different pipeline reuses the actions it has in common.
+        with mock.patch.object(Method, '_callable_executor_',
+                               autospec=True,
+                               side_effect=Method._callable_executor_
+                               ) as executor:
+            typical_pipeline(self.ints, mapping, False, add=2)
+        self.assertEqual(executor.call_count, 0)
+
+    def test_max_size(self):
+        split_ints = self.plugin.methods['split_ints']
+        split_ints(self.ints)
+        entry, = self.entries()
+        self.cache.max_size = int(
+            (self.cache_dir / 'entries' / entry / 'SIZE').read_text())
+
+        other = qiime2.Artifact.import_data(IntSequence1, [1, 2, 3])
+        split_ints(other)
+
+        self.assertNotIn(entry, self.entries())
+        self.assertEqual(len(self.entries()), 1)
+        self.assertEqual(list((self.cache_dir / 'staging').iterdir()), [])
+
+    def test_max_age(self):
+        split_ints = self.plugin.methods['split_ints']
+        split_ints(self.ints)
+        entry, = self.entries()
+        old = time.time() - 100
+        os.utime(str(self.cache_dir / 'entries' / entry), (old, old))
+        self.cache.max_age = 50
+
+        _, executed = self.call(Method, split_ints, self.ints)
+
+        self.assertEqual(executed, 1)
+        self.assertEqual(self.entries(), {entry})
+        # The entry was made again, so it is new.
+        self.assertGreater(
+            (self.cache_dir / 'entries' / entry).stat().st_mtime, old + 50)
+
+    def test_evicted_entry(self):
+        split_ints = self.plugin.methods['split_ints']
+        split_ints(self.ints)
+        entry, = self.entries()
+        # As if by another process.
+        shutil.rmtree(str(self.cache_dir / 'entries' / entry))
+
+        _, executed = self.call(Method, split_ints, self.ints)
+
+        self.assertEqual(executed, 1)
+
+    def test_unwritable_cache(self):
+        split_ints = self.plugin.methods['split_ints']
+
+        with mock.patch.object(ResultCache, 'add', autospec=True,
+                               side_effect=OSError('read-only file system')):
+            results = split_ints(self.ints)
+
+        self.assertEqual(results.left.view(list), [0])
+        self.assertEqual(results.right.view(list), [42, 43])
+        self.assertEqual(self.entries(), set())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -10,9 +10,12 @@ import collections
 import concurrent.futures
 import inspect
 import unittest
+import unittest.mock as mock
 import uuid
 
 import qiime2.plugin
+import qiime2.core.archive as archive
+import qiime2.sdk.action as action
 from qiime2.core.type import MethodSignature, Int
 from qiime2.sdk import Artifact, Method, Results
 
@@ -472,6 +475,86 @@ class TestMethod(unittest.TestCase):
         self.assertEqual(result.view(list),
                          [10, 20, 0, 42, 43, 99, -22, 55, 1])
 
+    def test_async_passes_artifacts_by_reference(self):
+        method = self.plugin.methods['variadic_input_method']
+        ints = [Artifact.import_data(IntSequence1, [1, 2, 3]),
+                Artifact.import_data(IntSequence2, [4, 5, 6])]
+        int_set = {Artifact.import_data(SingleInt, 7),
+                   Artifact.import_data(SingleInt, 8)}
+
+        with mock.patch.object(archive.Archiver, '__getstate__',
+                               autospec=True,
+                               side_effect=archive.Archiver.__getstate__
+                               ) as getstate:
+            future = method.asynchronous(ints, int_set, {9, 10}, [11, 12, 13])
+            result, = future.result()
+
+        getstate.assert_not_called()
+        self.assertEqual(result.view(list), list(range(1, 14)))
+        # The result's files now belong to this process.
+        self.assertTrue(result._destructor.alive)
+        # The inputs were only borrowed.
+        for artifact in ints + list(int_set):
+            self.assertTrue(artifact._destructor.alive)
+            self.assertTrue(artifact._archiver.path.exists())
+
+    def test_subprocess_apply_returns_references(self):
+        split_ints = self.plugin.methods['split_ints']
+        artifact = Artifact.import_data(IntSequence1, [0, 42, -2, 43, 6])
+
+        fields, references = action._subprocess_apply(
+            split_ints, [artifact._get_reference()], {})
+
+        self.assertEqual(fields, ('left', 'right'))
+        self.assertTrue(all(isinstance(ref, archive.ArchiverReference)
+                            for ref in references))
+        left, right = (Artifact._from_reference(ref, owned=True)
+                       for ref in references)
+        self.assertEqual(left.view(list), [0, 42])
+        self.assertEqual(right.view(list), [-2, 43, 6])
+        # Borrowing the input didn't take it over.
+        self.assertTrue(artifact._destructor.alive)
+
+    def test_async_reuses_workers(self):
+        split_ints = self.plugin.methods['split_ints']
+        artifact = Artifact.import_data(IntSequence1, [0, 42, -2, 43, 6])
+
+        with mock.patch.object(action.Action, 'ASYNC_WORKERS', 1):
+            futures = [split_ints.asynchronous(artifact) for _ in range(3)]
+            executor = action._get_async_executor()
+
+            for future in futures:
+                self.assertEqual(future.result().left.view(list), [0, 42])
+            self.assertIs(action._get_async_executor(), executor)
+            self.assertEqual(len(executor._processes), 1)
+
+        # Still usable after the workers are released.
+        action.shutdown_async_executor()
+        self.assertEqual(
+            split_ints.asynchronous(artifact).result().left.view(list),
+            [0, 42])
+
+    def test_async_thread_backend(self):
+        split_ints = self.plugin.methods['split_ints']
+        artifact = Artifact.import_data(IntSequence1, [0, 42, -2, 43, 6])
+
+        with mock.patch.object(action.Action, 'ASYNC_BACKEND', 'thread'):
+            future = split_ints.asynchronous(artifact)
+            self.assertIsInstance(action._get_async_executor(),
+                                  concurrent.futures.ThreadPoolExecutor)
+
+            self.assertEqual(future.result().right.view(list), [-2, 43, 6])
+        # The input is the caller's own, not a clone, so it is left intact.
+        self.assertTrue(artifact._destructor.alive)
+
+    def test_async_unknown_backend(self):
+        split_ints = self.plugin.methods['split_ints']
+        artifact = Artifact.import_data(IntSequence1, [0, 42, -2, 43, 6])
+
+        with mock.patch.object(action.Action, 'ASYNC_BACKEND', 'fibers'):
+            with self.assertRaisesRegex(ValueError, "backend: 'fibers'"):
+                split_ints.asynchronous(artifact)
+
     def test_async_with_multiple_outputs(self):
         split_ints = self.plugin.methods['split_ints']
 
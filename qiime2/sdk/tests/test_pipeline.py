@@ -7,12 +7,14 @@
 # ----------------------------------------------------------------------------
 
 import unittest
+import unittest.mock as mock
 import inspect
 
 import pandas as pd
 
 import qiime2
 import qiime2.sdk
+import qiime2.sdk.action as action
 from qiime2.core.testing.util import get_dummy_plugin
 from qiime2.core.testing.type import IntSequence1, SingleInt, Mapping
 from qiime2.plugin import Visualization, Int, Bool
@@ -70,7 +72,7 @@ class TestPipeline(unittest.TestCase):
                 'add', kind, default=1, annotation=Int))
         ]
 
-        for callable_attr in '__call__', 'asynchronous':
+        for callable_attr in '__call__', 'asynchronous', 'parallel':
             signature = inspect.Signature.from_callable(
                 getattr(typical_pipeline, callable_attr))
             parameters = list(signature.parameters.items())
@@ -200,5 +202,188 @@ class TestPipeline(unittest.TestCase):
                 call(self.int_sequence, break_from='no-action')
 
 
+def iter_backends(test):
+    for backend in 'process', 'thread':
+        with test.subTest(backend=backend):
+            with mock.patch.object(action.Action, 'ASYNC_BACKEND', backend):
+                yield
+
+
+class TestParallelPipeline(unittest.TestCase):
+    def setUp(self):
+        self.plugin = get_dummy_plugin()
+        self.ints1 = qiime2.Artifact.import_data(IntSequence1, [1, 2, 3])
+        self.ints2 = qiime2.Artifact.import_data(IntSequence1, [4, 5, 6, 7])
+        self.pipeline = self.plugin.pipelines['parallel_pipeline']
+
+    def test_parallel(self):
+        for _ in iter_backends(self):
+            left1, left2 = self.pipeline.parallel(self.ints1, self.ints2)
+
+            self.assertEqual(left1.view(list), [1])
+            self.assertEqual(left2.view(list), [4, 5])
+
+            # The outputs are aliases of the outputs of `split_ints`.
+            action = left1.provenance.root.action['action']
+            self.assertEqual(action['type'], 'pipeline')
+            self.assertEqual(action['action'], 'parallel_pipeline')
+            original = left1.provenance[action['alias-of']]
+            self.assertEqual(original.action['action']['action'],
+                             'split_ints')
+            self.assertEqual(original.action['action']['inputs'],
+                             [{'ints': str(self.ints1.uuid)}])
+
+    def test_parallel_without_actions(self):
+        pointless_pipeline = self.plugin.pipelines['pointless_pipeline']
+
+        single_int, = pointless_pipeline.parallel()
+
+        self.assertEqual(single_int.view(int), 4)
+
+    def test_intermediate_results_are_cleaned_up(self):
+        for _ in iter_backends(self):
+            ctx = qiime2.sdk.ParallelContext()
+            with ctx:
+                split_ints = ctx.get_action('dummy_plugin', 'split_ints')
+                futures = [split_ints(self.ints1), split_ints(self.ints2)]
+                # Not waited for.
+                results = list(futures.pop().result())
+
+            results += futures.pop().result()
+            for result in results:
+                self.assertFalse(result._archiver.path.exists())
+            self.assertTrue(self.ints1._archiver.path.exists())
+
+    def test_failure_cleans_up(self):
+        for _ in iter_backends(self):
+            ctx = qiime2.sdk.ParallelContext()
+            with self.assertRaisesRegex(ValueError, 'pipeline failed'):
+                with ctx:
+                    split_ints = ctx.get_action('dummy_plugin', 'split_ints')
+                    future = split_ints(self.ints1)
+                    raise ValueError('pipeline failed')
+
+            if not future.cancelled():
+                for result in future.result():
+                    self.assertFalse(result._archiver.path.exists())
+
+    def test_action_failure(self):
+        for _ in iter_backends(self):
+            ctx = qiime2.sdk.ParallelContext()
+            with ctx:
+                merge_mappings = ctx.get_action('dummy_plugin',
+                                                'merge_mappings')
+                a = ctx.make_artifact(Mapping, {'foo': 'a'})
+                b = ctx.make_artifact(Mapping, {'foo': 'b'})
+                future = merge_mappings(a, b)
+
+                with self.assertRaisesRegex(ValueError, "Key 'foo' exists"):
+                    future.result()
+
+
+class TestLazyPipeline(unittest.TestCase):
+    def setUp(self):
+        self.plugin = get_dummy_plugin()
+        self.ints = qiime2.Artifact.import_data(IntSequence1, [1, 2, 2, 3])
+        self.pipeline = self.plugin.pipelines['lazy_pipeline']
+
+    def test_lazy(self):
+        for _ in iter_backends(self):
+            left_viz, right_viz = self.pipeline.lazy(self.ints)
+
+            self.assertEqual(left_viz.type, Visualization)
+            self.assertEqual(right_viz.type, Visualization)
+            action = right_viz.provenance.root.action['action']
+            self.assertEqual(action['action'], 'lazy_pipeline')
+            original = right_viz.provenance[action['alias-of']]
+            self.assertEqual(original.action['action']['action'],
+                             'most_common_viz')
+
+    def test_same_as_call(self):
+        left_viz, right_viz = self.pipeline(self.ints)
+
+        self.assertEqual(left_viz.type, Visualization)
+        self.assertEqual(right_viz.type, Visualization)
+
+    def test_proxies(self):
+        for _ in iter_backends(self):
+            with qiime2.sdk.LazyContext() as scope:
+                split_ints = scope.ctx.get_action('dummy_plugin',
+                                                  'split_ints')
+                results = split_ints(self.ints)
+
+                self.assertEqual(results._fields, ('left', 'right'))
+                left = results.left
+                self.assertIsInstance(left, qiime2.sdk.ProxyResult)
+                self.assertEqual(left.view(list), [1, 2])
+                self.assertTrue(left.done())
+                self.assertIsInstance(left.result(), qiime2.Artifact)
+
+    def test_dependencies(self):
+        for _ in iter_backends(self):
+            with qiime2.sdk.LazyContext() as scope:
+                split_ints = scope.ctx.get_action('dummy_plugin',
+                                                  'split_ints')
+                left, _ = split_ints(self.ints)
+                quarter, _ = split_ints(left)
+                eighth, _ = split_ints(quarter)
+
+                self.assertEqual(eighth.view(list), [])
+                self.assertEqual(quarter.view(list), [1])
+
+    def test_intermediates_are_released(self):
+        for _ in iter_backends(self):
+            with qiime2.sdk.LazyContext() as scope:
+                split_ints = scope.ctx.get_action('dummy_plugin',
+                                                  'split_ints')
+                most_common_viz = scope.ctx.get_action('dummy_plugin',
+                                                       'most_common_viz')
+
+                left, right = split_ints(self.ints)
+                viz, = most_common_viz(left)
+                future = left._future
+                left_result, right_result = future.result()
+
+                # Neither used by the pipeline nor by an action.
+                del right
+                self.assertFalse(right_result._archiver.path.exists())
+
+                del left
+                viz.result()
+                self.assertFalse(left_result._archiver.path.exists())
+                self.assertTrue(self.ints._archiver.path.exists())
+
+    def test_used_results_are_kept(self):
+        for _ in iter_backends(self):
+            with qiime2.sdk.LazyContext() as scope:
+                split_ints = scope.ctx.get_action('dummy_plugin',
+                                                  'split_ints')
+                left, right = split_ints(self.ints)
+                left_result = left.result()
+                right.view(list)
+                right_result = right._get()
+
+                del left, right
+                self.assertEqual(left_result.view(list), [1, 2])
+                self.assertTrue(right_result._archiver.path.exists())
+
+            self.assertFalse(left_result._archiver.path.exists())
+            self.assertFalse(right_result._archiver.path.exists())
+
+    def test_failed_input(self):
+        for _ in iter_backends(self):
+            with qiime2.sdk.LazyContext() as scope:
+                merge_mappings = scope.ctx.get_action('dummy_plugin',
+                                                      'merge_mappings')
+                a = scope.ctx.make_artifact(Mapping, {'foo': 'a'})
+                b = scope.ctx.make_artifact(Mapping, {'foo': 'b'})
+
+                merged, = merge_mappings(a, b)
+                merged_again, = merge_mappings(merged, a)
+
+                with self.assertRaisesRegex(ValueError, "Key 'foo' exists"):
+                    merged_again.result()
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -9,12 +9,17 @@
 import os
 import tempfile
 import unittest
+import unittest.mock
 import pathlib
 
+import pandas as pd
+
+import qiime2
 import qiime2.core.type
 from qiime2.sdk import Result, Artifact, Visualization
 from qiime2.sdk.result import ResultMetadata
 import qiime2.core.archive as archive
+from qiime2.core.archive.format.util import artifact_version
 import qiime2.core.exceptions as exceptions
 
 from qiime2.core.testing.type import FourInts
@@ -99,6 +104,7 @@ class TestResult(unittest.TestCase, ArchiveTestingMixin):
             'provenance/metadata.yaml',
             'provenance/VERSION',
             'provenance/citations.bib',
+            'provenance/index.json',
             'provenance/action/action.yaml'
         }
 
@@ -124,6 +130,7 @@ class TestResult(unittest.TestCase, ArchiveTestingMixin):
             'provenance/metadata.yaml',
             'provenance/VERSION',
             'provenance/citations.bib',
+            'provenance/index.json',
             'provenance/action/action.yaml'
         }
 
@@ -154,6 +161,30 @@ class TestResult(unittest.TestCase, ArchiveTestingMixin):
         self.assertEqual(metadata.uuid, str(visualization.uuid))
         self.assertIsNone(metadata.format)
 
+    def test_peek_many(self):
+        artifact1 = Artifact.import_data(FourInts, [0, 0, 42, 1000])
+        artifact2 = Artifact.import_data('IntSequence1', [1, 2, 3])
+        visualization = Visualization._from_data_dir(
+             self.data_dir, self.make_provenance_capture())
+        fps = []
+        for i, result in enumerate([artifact1, visualization, artifact2]):
+            fps.append(result.save(
+                os.path.join(self.test_dir.name, 'result%d' % i)))
+
+        metadata = Result.peek_many(fps, workers=2)
+
+        self.assertEqual(metadata, [
+            ResultMetadata(str(artifact1.uuid), 'FourInts',
+                           'FourIntsDirectoryFormat'),
+            ResultMetadata(str(visualization.uuid), 'Visualization', None),
+            ResultMetadata(str(artifact2.uuid), 'IntSequence1',
+                           'IntSequenceDirectoryFormat')])
+        self.assertEqual(Result.peek_many(iter(fps)), metadata)
+        self.assertEqual(Result.peek_many([]), [])
+
+        with self.assertRaisesRegex(ValueError, 'does not exist'):
+            Result.peek_many(fps + ['missing.qza'])
+
     def test_save_artifact_auto_extension(self):
         artifact = Artifact.import_data(FourInts, [0, 0, 42, 1000])
 
@@ -236,6 +267,18 @@ class TestResult(unittest.TestCase, ArchiveTestingMixin):
                                     r'extra\.file'):
             artifact.validate()
 
+    def test_validate_artifact_modes(self):
+        artifact = Artifact.import_data('IntSequence1', [1, 2, 3, 4])
+
+        artifact.validate(incremental=True, sample=2, workers=2,
+                          fail_fast=True)
+
+        with (artifact._archiver.data_dir / 'ints.txt').open('w') as fh:
+            fh.write('5\n')
+        with self.assertRaisesRegex(exceptions.ValidationError,
+                                    r'Changed files:\n.*ints\.txt'):
+            artifact.validate(incremental=True, workers=2)
+
     def test_validate_vizualization_good(self):
         visualization = Visualization._from_data_dir(
              self.data_dir, self.make_provenance_capture())
@@ -254,6 +297,93 @@ class TestResult(unittest.TestCase, ArchiveTestingMixin):
                                     r'extra\.file'):
             visualization.validate()
 
+    def make_lineage(self):
+        dummy_plugin = get_dummy_plugin()
+        ints = Artifact.import_data('IntSequence1', [1, 2, 3])
+        mapping = Artifact.import_data('Mapping', {'a': '42'})
+        md = qiime2.Metadata(pd.DataFrame(
+            {'b': ['1']}, index=pd.Index(['0'], name='id')))
+        left, _ = dummy_plugin.actions['split_ints'](ints)
+        merged, = dummy_plugin.actions['merge_mappings'](mapping, mapping)
+        out, = dummy_plugin.actions['identity_with_metadata'](
+            left, md.merge(merged.view(qiime2.Metadata)))
+        return ints, mapping, left, merged, out
+
+    def test_provenance(self):
+        ints, mapping, left, merged, out = self.make_lineage()
+
+        prov = out.provenance
+
+        self.assertEqual(prov.root.uuid, str(out.uuid))
+        self.assertEqual(prov.root.type, 'IntSequence1')
+        self.assertEqual(len(prov), 5)
+        self.assertEqual({n.uuid for n in prov},
+                         {str(r.uuid) for r in (ints, mapping, left, merged,
+                                                out)})
+        self.assertEqual({p.uuid for p in prov.root.parents},
+                         {str(left.uuid), str(merged.uuid)})
+        ancestors = [a.uuid for a in prov.ancestors()]
+        self.assertEqual(set(ancestors[:2]),
+                         {str(left.uuid), str(merged.uuid)})
+        self.assertEqual(set(ancestors[2:]),
+                         {str(ints.uuid), str(mapping.uuid)})
+        self.assertEqual([a.uuid for a in prov.ancestors(left.uuid)],
+                         [str(ints.uuid)])
+        self.assertEqual(prov[merged.uuid].parents, [prov[mapping.uuid]])
+
+        node = prov.root
+        self.assertEqual(node.action['action']['action'],
+                         'identity_with_metadata')
+        self.assertEqual(node.inputs, {'ints': str(left.uuid)})
+        self.assertEqual(node.parameters['metadata'].path,
+                         '%s:metadata.tsv' % merged.uuid)
+        self.assertIsNone(prov[ints.uuid].action['action'].get('inputs'))
+
+    def test_provenance_reads_lazily(self):
+        *_, out = self.make_lineage()
+        fp = os.path.join(self.test_dir.name, 'out.qza')
+        out.save(fp)
+
+        loaded = Result.load(fp, lazy=True)
+        prov = loaded.provenance
+        with unittest.mock.patch.object(
+                loaded._archiver, 'open',
+                wraps=loaded._archiver.open) as open_:
+            ancestors = list(prov.ancestors())
+            self.assertEqual(open_.call_count, 1)  # just index.json
+
+            for node in ancestors:
+                node.parameters
+                node.inputs
+            self.assertEqual(open_.call_count, 5)
+
+        self.assertFalse(loaded._archiver.is_mounted('provenance'))
+        self.assertIs(loaded.provenance, prov)
+
+    def test_provenance_without_index(self):
+        ints, mapping, left, merged, out = self.make_lineage()
+        prov_dir = out._archiver.provenance_dir
+        for fp in prov_dir.glob('**/index.json'):
+            fp.unlink()
+
+        prov = out.provenance
+
+        self.assertEqual(len(prov), 5)
+        self.assertEqual(prov.root.type, 'IntSequence1')
+        self.assertEqual({a.uuid for a in prov.ancestors()},
+                         {str(left.uuid), str(merged.uuid), str(ints.uuid),
+                          str(mapping.uuid)})
+        self.assertEqual({p.uuid for p in prov.root.parents},
+                         {str(left.uuid), str(merged.uuid)})
+        self.assertEqual([p.uuid for p in prov[merged.uuid].parents],
+                         [str(mapping.uuid)])
+
+    def test_provenance_version_0(self):
+        with artifact_version(0):
+            ints = Artifact.import_data('IntSequence1', [1, 2, 3])
+
+        self.assertIsNone(ints.provenance)
+
 
 if __name__ == '__main__':
     unittest.main()
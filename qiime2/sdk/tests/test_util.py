@@ -40,6 +40,8 @@ class TestUtil(unittest.TestCase):
             'Visualize most common integers',
             'Split sequence of integers in half',
             'Test different ways of failing', 'Optional artifacts method',
+            'Split two sequences at once',
+            'Visualize both halves of a sequence',
             'Do stuff normally, but override this one step sometimes'])]
         self.assertEqual(len(obs), 1)
         self.assertEqual(obs[0][0], exp[0][0])
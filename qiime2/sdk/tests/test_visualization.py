@@ -9,6 +9,7 @@
 import os
 import tempfile
 import unittest
+import unittest.mock as mock
 import uuid
 import collections
 import pathlib
@@ -17,6 +18,7 @@ import qiime2.core.type
 from qiime2.sdk import Visualization
 from qiime2.sdk.result import ResultMetadata
 import qiime2.core.archive as archive
+import qiime2.core.util as util
 
 from qiime2.core.testing.visualizer import (
     mapping_viz, most_common_viz, multi_html_viz)
@@ -68,6 +70,18 @@ class TestVisualization(unittest.TestCase, ArchiveTestingMixin):
         self.assertEqual(visualization.type, qiime2.core.type.Visualization)
         self.assertIsInstance(visualization.uuid, uuid.UUID)
 
+    def test_from_data_dir_hashes_while_copying(self):
+        with mock.patch('qiime2.core.util.md5sum',
+                        wraps=util.md5sum) as md5sum:
+            visualization = Visualization._from_data_dir(
+                self.data_dir, self.make_provenance_capture())
+
+        hashed = {str(call[0][0]) for call in md5sum.call_args_list}
+        data_dir = str(visualization._archiver.data_dir)
+        self.assertFalse([fp for fp in hashed if fp.startswith(data_dir)])
+        self.assertEqual(visualization._archiver.validate_checksums(),
+                         ({}, {}, {}))
+
     def test_from_data_dir_and_save(self):
         fp = os.path.join(self.test_dir.name, 'visualization.qzv')
         visualization = Visualization._from_data_dir(
@@ -85,6 +99,7 @@ class TestVisualization(unittest.TestCase, ArchiveTestingMixin):
             'provenance/metadata.yaml',
             'provenance/VERSION',
             'provenance/citations.bib',
+            'provenance/index.json',
             'provenance/action/action.yaml'
         }
 
@@ -124,6 +139,7 @@ class TestVisualization(unittest.TestCase, ArchiveTestingMixin):
             'provenance/metadata.yaml',
             'provenance/VERSION',
             'provenance/citations.bib',
+            'provenance/index.json',
             'provenance/action/action.yaml'
         }
 
@@ -139,6 +155,7 @@ class TestVisualization(unittest.TestCase, ArchiveTestingMixin):
             'provenance/metadata.yaml',
             'provenance/VERSION',
             'provenance/citations.bib',
+            'provenance/index.json',
             'provenance/action/action.yaml'
         }
 
@@ -215,6 +232,7 @@ class TestVisualization(unittest.TestCase, ArchiveTestingMixin):
             'provenance/metadata.yaml',
             'provenance/VERSION',
             'provenance/citations.bib',
+            'provenance/index.json',
             'provenance/action/action.yaml'
         }
 
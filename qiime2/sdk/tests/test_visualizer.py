@@ -130,6 +130,12 @@ class TestVisualizer(unittest.TestCase, ArchiveTestingMixin):
         self.assertTrue(callable(self.plugin.visualizers['mapping_viz']))
         self.assertTrue(callable(self.plugin.visualizers['most_common_viz']))
 
+    def test_no_pipeline_only_callables(self):
+        mapping_viz = self.plugin.visualizers['mapping_viz']
+
+        self.assertFalse(hasattr(mapping_viz, 'parallel'))
+        self.assertFalse(hasattr(mapping_viz, 'lazy'))
+
     def test_callable_properties(self):
         mapping_viz = self.plugin.visualizers['mapping_viz']
         most_common_viz = self.plugin.visualizers['most_common_viz']
@@ -247,6 +253,7 @@ class TestVisualizer(unittest.TestCase, ArchiveTestingMixin):
             'provenance/metadata.yaml',
             'provenance/VERSION',
             'provenance/citations.bib',
+            'provenance/index.json',
             'provenance/action/action.yaml',
             'provenance/artifacts/%s/metadata.yaml' % artifact1.uuid,
             'provenance/artifacts/%s/VERSION' % artifact1.uuid,
@@ -296,6 +303,7 @@ class TestVisualizer(unittest.TestCase, ArchiveTestingMixin):
             'provenance/metadata.yaml',
             'provenance/VERSION',
             'provenance/citations.bib',
+            'provenance/index.json',
             'provenance/action/action.yaml',
             'provenance/artifacts/%s/metadata.yaml' % artifact.uuid,
             'provenance/artifacts/%s/VERSION' % artifact.uuid,
@@ -327,6 +335,7 @@ class TestVisualizer(unittest.TestCase, ArchiveTestingMixin):
             'provenance/metadata.yaml',
             'provenance/VERSION',
             'provenance/citations.bib',
+            'provenance/index.json',
             'provenance/action/action.yaml'
         }
 
@@ -353,6 +362,7 @@ class TestVisualizer(unittest.TestCase, ArchiveTestingMixin):
             'provenance/metadata.yaml',
             'provenance/VERSION',
             'provenance/citations.bib',
+            'provenance/index.json',
             'provenance/action/action.yaml'
         }
 
@@ -398,6 +408,7 @@ class TestVisualizer(unittest.TestCase, ArchiveTestingMixin):
             'provenance/metadata.yaml',
             'provenance/VERSION',
             'provenance/citations.bib',
+            'provenance/index.json',
             'provenance/action/action.yaml',
             'provenance/artifacts/%s/metadata.yaml' % artifact1.uuid,
             'provenance/artifacts/%s/VERSION' % artifact1.uuid,